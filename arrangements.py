@@ -0,0 +1,335 @@
+import os, random, struct, sys
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import product
+from battleships import FLEET
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "battleships") # where counting tables are kept between runs
+MAGIC = b"BSAT" # identifies a stored counting table
+VERSION = 1 # to be increased whenever the layout of the keys (see _key and _code) or of the file changes
+# magic, version, byte order of the 64-bit ints ("l" or "b"), rows, cols, number of ship lengths, number of entries
+HEADER = struct.Struct("<4sBcHHHQ")
+
+class ArrangementCounter(object):
+    '''
+    counts, and samples exactly uniformly from, the legal arrangements of a fleet in an ocean of the given size.
+    The ocean is filled row by row, and the state passed from one row to the next records, for each column,
+    whether the square above it is empty (0), the bottom of a vertical run of that many squares that may
+    still grow, or closed (equal to the longest ship's length), in which case the square must stay empty.
+    Ships of the same length are interchangeable, so each arrangement is a distinct set of occupied squares
+    '''
+    def __init__(self, rows=10, cols=10, fleet=FLEET, cache_dir=CACHE_DIR):
+        self._rows = rows
+        self._cols = cols
+        self._closed = max(fleet) # a vertical run as long as the longest ship cannot grow, so it doubles as closed
+        # number of ships of each length, indexed by length - 1
+        self._fleet = tuple(fleet.count(i) for i in range(1, self._closed + 1))
+        # every tuple of ships that may remain to be completed, indexed so that the table keys are plain ints
+        self._left = list(product(*[range(i + 1) for i in self._fleet]))
+        self._left_index = {j: i for i, j in enumerate(self._left)}
+        self._subtract = [{} for _ in self._left]
+        self._transitions = {}
+        self._counts = {} # memo used while counting, dropped once the table is built
+        self._keys = self._values = None # sorted keys and counts of the nonzero entries of the counting table
+        self._path = None
+        if cache_dir:
+            name = f"arrangements-{rows}x{cols}-{'-'.join(map(str, self._fleet))}.bin"
+            self._path = os.path.join(cache_dir, name)
+            self._load()
+
+    def _header(self, size):
+        '''
+        returns the header of a stored table of size entries for this counter, followed by the number of ships
+        of each length
+        '''
+        return (HEADER.pack(MAGIC, VERSION, sys.byteorder[0].encode(), self._rows, self._cols, self._closed, size) +
+                struct.pack(f"<{self._closed}H", *self._fleet))
+
+    def _load(self):
+        '''
+        reads the counting table stored on disk by an earlier process, if there is one. The file holds a header
+        (see _header) followed by the sorted keys and their counts, as native 64-bit ints. A file whose header
+        does not match this counter, such as one written by an older version or on a machine of the other
+        byte order, is ignored, so the table is counted again and the file replaced
+        '''
+        try:
+            with open(self._path, "rb") as f:
+                header = f.read(HEADER.size + 2 * self._closed)
+                if len(header) < HEADER.size:
+                    return
+                size = HEADER.unpack_from(header)[-1]
+                if header != self._header(size):
+                    return
+                keys, values = array("q"), array("q")
+                keys.fromfile(f, size)
+                values.fromfile(f, size)
+                if f.read(1):
+                    return
+        except (OSError, EOFError):
+            return
+        self._keys, self._values = keys, values
+
+    def _save(self):
+        '''
+        writes the counting table to disk so that later processes can skip the count
+        '''
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            tmp = f"{self._path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(self._header(len(self._keys)))
+                self._keys.tofile(f)
+                self._values.tofile(f)
+            os.replace(tmp, self._path) # replaces the table atomically so concurrent readers never see a partial file
+        except OSError:
+            pass # the table is only a cache, so failing to store it is not an error
+
+    def _lookup(self, key):
+        '''
+        returns the count stored in the table under key. Entries missing from the table are zero
+        '''
+        if self._keys is None:
+            return self._counts.get(key, 0)
+        i = bisect_left(self._keys, key)
+        return self._values[i] if i < len(self._keys) and self._keys[i] == key else 0
+
+    def _key(self, row, code, left):
+        '''
+        returns the int key of the counting table entry for the given row, state code and index of remaining ships
+        '''
+        return (code * (self._rows + 1) + row) * len(self._left) + left
+
+    def _after(self, left, completed):
+        '''
+        returns the index of the ships remaining once the ships in completed are removed from those of index left,
+        or -1 if completed holds more ships of some length than remain
+        '''
+        table = self._subtract[left]
+        if completed not in table:
+            rest = tuple(i - j for i, j in zip(self._left[left], completed))
+            table[completed] = self._left_index[rest] if min(rest) >= 0 else -1
+
+        return table[completed]
+
+    def transitions(self, state):
+        '''
+        returns a list of (mask, new_state, code, completed) tuples, one for every legal way of filling the next
+        row below a row in the given state. mask has bit c set if column c is occupied, code is the int encoding
+        of new_state and completed holds the number of ships of each length finished by the move
+        '''
+        if state in self._transitions:
+            return self._transitions[state]
+
+        cols = self._cols
+        allowed = 0
+        for c in range(cols):
+            # a square may only be occupied if it is not closed off and nothing lies diagonally above it
+            if state[c] != self._closed and (c == 0 or not state[c - 1]) and (c == cols - 1 or not state[c + 1]):
+                allowed |= 1 << c
+
+        moves = []
+        m = allowed
+        while True: # iterates over every submask of allowed, ending with the empty row
+            move = self._fill(state, m)
+            if move:
+                new, completed = move
+                # a state and its mirror image are completed in the same number of ways, so they share a code
+                code = min(self._code(new), self._code(new[::-1]))
+                moves.append((m, new, code, completed))
+            if not m:
+                break
+            m = (m - 1) & allowed
+
+        self._transitions[state] = moves
+        return moves
+
+    def _code(self, state):
+        '''
+        returns the int encoding of state
+        '''
+        code = 0
+        for i in state:
+            code = code * (self._closed + 1) + i
+
+        return code
+
+    def _fill(self, state, mask):
+        '''
+        returns (new_state, completed) for the row given by mask below a row in the given state, or None if
+        the row contains a run that is not a legal ship
+        '''
+        new = [0] * self._cols
+        completed = [0] * self._closed
+        c = 0
+        while c < self._cols:
+            if not mask >> c & 1:
+                if 0 < state[c] < self._closed: # a vertical run above that does not continue is a finished ship
+                    completed[state[c] - 1] += 1
+                c += 1
+                continue
+
+            end = c
+            while end + 1 < self._cols and mask >> (end + 1) & 1:
+                end += 1
+            lth = end - c + 1
+            if lth == 1:
+                new[c] = state[c] + 1 # starts or extends a vertical run
+                if new[c] == self._closed: # a run as long as the longest ship is finished at once
+                    completed[-1] += 1
+            elif lth > self._closed or any(state[c:end + 1]):
+                return None # too long, or a horizontal run joined onto a vertical one
+            else:
+                completed[lth - 1] += 1
+                new[c:end + 1] = [self._closed] * lth
+            c = end + 1
+
+        return tuple(new), tuple(completed)
+
+    def _fits(self, state, left):
+        '''
+        returns Boolean value indicating whether each vertical run still growing in state can be matched
+        to a distinct remaining ship at least as long as it
+        '''
+        runs = [i for i in state if 0 < i < self._closed]
+        if not runs:
+            return True
+        ships = self._left[left]
+        for k in range(1, self._closed):
+            if sum(i >= k for i in runs) > sum(ships[k - 1:]):
+                return False
+
+        return True
+
+    def _count_from(self, row, state, code, left):
+        '''
+        returns the number of ways of filling rows row onwards below a row in the given state,
+        such that exactly the ships of index left are completed
+        '''
+        key = self._key(row, code, left)
+        if key in self._counts:
+            return self._counts[key]
+
+        total = 0
+        if row == self._rows:
+            completed = [0] * self._closed
+            for i in state:
+                if 0 < i < self._closed:
+                    completed[i - 1] += 1
+            total = int(tuple(completed) == self._left[left])
+        elif self._fits(state, left):
+            for _, new, new_code, completed in self.transitions(state):
+                rest = self._after(left, completed)
+                if rest >= 0:
+                    total += self._count_from(row + 1, new, new_code, rest)
+
+        self._counts[key] = total
+        return total
+
+    def count(self):
+        '''
+        returns the number of legal arrangements of the fleet
+        '''
+        left = self._left_index[self._fleet]
+        if self._keys is None:
+            self._count_from(0, (0,) * self._cols, 0, left)
+            self._build()
+
+        return self._lookup(self._key(0, 0, left))
+
+    def _build(self):
+        '''
+        replaces the memo used while counting with the sorted table of its nonzero entries, and stores the
+        table on disk if its counts fit in 64 bits
+        '''
+        entries = sorted((k, v) for k, v in self._counts.items() if v)
+        self._counts = {}
+        self._keys = [k for k, _ in entries]
+        self._values = [v for _, v in entries]
+        if max(self._keys[-1:] + self._values, default=0) < 2 ** 63:
+            self._keys, self._values = array("q", self._keys), array("q", self._values)
+            if self._path:
+                self._save()
+
+    def sample(self, rng=random):
+        '''
+        returns a fleet drawn exactly uniformly from all legal arrangements, using rng (a random.Random, 
+        or the random module, or a NumPy Generator) as the source of randomness
+        '''
+        total = self.count()
+        if not total:
+            raise ValueError("the fleet cannot be legally arranged in the ocean")
+
+        state, left = (0,) * self._cols, self._left_index[self._fleet]
+        rows = []
+        for row in range(self._rows):
+            # picks each row with probability proportional to the number of arrangements that complete it
+            pick = _randrange(rng, total)
+            for mask, new, code, completed in self.transitions(state):
+                rest = self._after(left, completed)
+                if rest < 0:
+                    continue
+                weight = self._lookup(self._key(row + 1, code, rest))
+                if pick < weight:
+                    break
+                pick -= weight
+            rows.append(mask)
+            state, left, total = new, rest, weight
+
+        return self._ships(rows, rng)
+
+    def _ships(self, rows, rng):
+        '''
+        converts the occupied squares given by the row masks into a fleet, ordered longest ship first
+        '''
+        occupied = {(r, c) for r, m in enumerate(rows) for c in range(self._cols) if m >> c & 1}
+        flt = []
+        for r, c in sorted(occupied):
+            if (r - 1, c) in occupied or (r, c - 1) in occupied:
+                continue # not the top-left square of a ship
+            hor = (r, c + 1) in occupied
+            lth = 1
+            while (r + lth * (not hor), c + lth * hor) in occupied:
+                lth += 1
+            if lth == 1:
+                hor = bool(_randrange(rng, 2)) # a submarine's orientation is only cosmetic
+            flt.append((r, c, hor, lth, set()))
+
+        return sorted(flt, key=lambda i: -i[3])
+
+def _randrange(rng, n):
+    '''
+    returns an integer drawn exactly uniformly from range(n) by rng, a random.Random (or the random module)
+    or a NumPy Generator, which has no randrange method. Counts beyond 64 bits are drawn from random bytes
+    of the Generator, starting over whenever the number they make is not below n
+    '''
+    if not hasattr(rng, "integers"):
+        return rng.randrange(n)
+    if n < 2 ** 63:
+        return int(rng.integers(n))
+
+    bits = n.bit_length()
+    while True:
+        pick = int.from_bytes(rng.bytes((bits + 7) // 8), "little") >> (-bits % 8)
+        if pick < n:
+            return pick
+
+@lru_cache(maxsize=None)
+def _counter(rows, cols, fleet):
+    '''
+    returns the shared ArrangementCounter for the given ocean size and fleet
+    '''
+    return ArrangementCounter(rows, cols, fleet)
+
+def count_arrangements(fleet=FLEET, rows=10, cols=10):
+    '''
+    returns the number of legal arrangements of fleet, given as a tuple of ship lengths, in an ocean of rows by cols
+    '''
+    return _counter(rows, cols, tuple(fleet)).count()
+
+def uniformly_place_all_ships(rng=random):
+    '''
+    returns a fleet drawn exactly uniformly from all legal arrangements of the 10 ships in the ocean,
+    using rng as in ArrangementCounter.sample
+    '''
+    return _counter(10, 10, FLEET).sample(rng)
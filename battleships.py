@@ -1,5 +1,15 @@
-from random import randint as ri
-import sys, re
+import random
+from functools import lru_cache
+import argparse, os, sys, re, tempfile
+import instrument
+
+FLEET = (4, 3, 3, 2, 2, 2, 1, 1, 1, 1) # lengths of the ships of a fleet, in the order they are placed
+ROWS, COLS = 10, 10 # dimensions of the ocean
+SLOT_TABLE_LIMIT = 1024 # largest ocean, in squares, on which fleets are placed from a slot table of bitboards
+RESTARTS = 1000 # largest number of times a placement from the slot table starts over before giving up
+BLOCK = 4096 # number of random numbers RandomBlocks draws at a time by default
+BATCH_FLUSH = 1024 # number of games whose results batch mode writes out at a time
+RANDRANGE_LIMIT = 2 ** 32 # largest range RandomBlocks draws an integer from, its floats giving near uniform draws up to it
 
 def is_sunk(ship):
         '''
@@ -24,37 +34,107 @@ def coords(row, col, hor, lth):
     given the first four elements of a ship, returns a
     set of tuples containing the coordinates the ship occupies.
     '''
+    if instrument.enabled:
+        instrument.count("coords")
+    # copies the cached footprint so that callers are free to mutate the returned set
+    return set(_footprint(row, col, hor, lth))
+
+@lru_cache(maxsize=4096) # bounded, as the ships of a large ocean are too many to keep
+def _footprint(row, col, hor, lth):
+    '''
+    returns a frozenset of the coordinates occupied by the ship given by row, col, hor and lth,
+    computed once per distinct ship and shared between calls
+    '''
     occupies = []
     for i in range(lth):
         occupies.append([row, col])
         # increments value of the element of the most recently appended sublist, of index 'hor', by i
         occupies[i][hor] += i
 
-    return {tuple(i) for i in occupies}
+    return frozenset(tuple(i) for i in occupies)
+
+def cell_mask(row, col, rows=ROWS, cols=COLS):
+    '''
+    returns the bit of the (rows * cols)-bit ocean mask that represents the square given by row and col,
+    or 0 if the square lies outside the ocean
+    '''
+    return 1 << (row * cols + col) if row in range(rows) and col in range(cols) else 0
 
-def is_open_sea(row, col, flt):
+@lru_cache(maxsize=16384) # bounded, as a mask is as wide as the ocean
+def ship_mask(row, col, hor, lth, rows=ROWS, cols=COLS):
+    '''
+    returns the (rows * cols)-bit mask of the squares in the ocean occupied by the ship given by
+    row, col, hor and lth. Squares falling outside the ocean are not represented
+    '''
+    mask = 0
+    for r, c in _footprint(row, col, hor, lth):
+        mask |= cell_mask(r, c, rows, cols)
+
+    return mask
+
+@lru_cache(maxsize=16384) # bounded, as a mask is as wide as the ocean
+def halo_mask(row, col, hor, lth, rows=ROWS, cols=COLS):
+    '''
+    returns the (rows * cols)-bit mask of the squares in the ocean that are occupied by, or adjacent 
+    (horizontally, vertically, or diagonally) to, the ship given by row, col, hor and lth
+    '''
+    mask = 0
+    for r, c in _footprint(row, col, hor, lth):
+        for i in range(r - 1, r + 2):
+            for j in range(c - 1, c + 2):
+                mask |= cell_mask(i, j, rows, cols)
+
+    return mask
+
+def fleet_mask(flt, rows=ROWS, cols=COLS):
+    '''
+    returns the (rows * cols)-bit occupancy mask of all squares occupied by the ships of flt
+    '''
+    mask = 0
+    for k in flt:
+        mask |= ship_mask(*k[:4], rows, cols)
+
+    return mask
+
+def _indexed(flt, rows=ROWS, cols=COLS):
+    '''
+    returns flt if it is a Fleet, a Fleet indexing the ships of flt if the ocean is larger than 
+    SLOT_TABLE_LIMIT squares, where bitboards would be too wide to build, and None otherwise. 
+    The ships are shared with flt, so hits recorded through the Fleet are recorded in flt
+    '''
+    if isinstance(flt, Fleet):
+        return flt
+    return Fleet(flt, rows, cols) if rows * cols > SLOT_TABLE_LIMIT else None
+
+def is_open_sea(row, col, flt, rows=ROWS, cols=COLS):
     '''
     checks if the square given by row and col neither contains 
     nor is adjacent (horizontally, vertically, or diagonally) to some ship in flt. 
     Returns Boolean True if so and False otherwise
     '''
-    r, c = (range(row - 1, row + 2), range(col - 1, col + 2)) # ranges that must be vacant for the function to return True
-    for k in flt:
-        # checks if either r or c match, or are adjacent to, coordinates of existing ships
-        if any([i in r and j in c for i, j in coords(*k[:4])]):
-            return False
+    indexed = _indexed(flt, rows, cols)
+    if indexed is not None:
+        return indexed.is_open_sea(row, col)
 
-    return True
+    # the halo of a single square covers the square itself and its neighbours
+    return not halo_mask(row, col, True, 1, rows, cols) & fleet_mask(flt, rows, cols)
 
-def ok_to_place_ship_at(row, col, hor, lth, flt):
+def ok_to_place_ship_at(row, col, hor, lth, flt, rows=ROWS, cols=COLS):
     '''
     checks if addition of a ship, specified by row, col, hor, and lth 
-    to the flt results in a legal arrangement. If so, the function returns Boolean True 
-    and it returns False otherwise. This function makes use of the function is_open_sea
+    to the flt results in a legal arrangement in an ocean of the given dimensions. If so, the function 
+    returns Boolean True and it returns False otherwise. This function makes use of the bitboard form 
+    of is_open_sea, or of the square index of flt if it is a Fleet or the ocean is large
     '''
-    b = range(0, 10)
-    # checks that each coordinate that the proposed ship would occupy, falls within both the ocean and open sea
-    return all([is_open_sea(r, c, flt) and r in b and c in b for (r, c) in coords(row, col, hor, lth)])
+    indexed = _indexed(flt, rows, cols)
+    if indexed is not None:
+        return indexed.ok_to_place_ship_at(row, col, hor, lth)
+
+    # a ship with fewer bits than its length has at least one square outside the ocean
+    if ship_mask(row, col, hor, lth, rows, cols).bit_count() != lth:
+        return False
+
+    return not halo_mask(row, col, hor, lth, rows, cols) & fleet_mask(flt, rows, cols)
 
 def place_ship_at(row, col, hor, lth, flt):
     '''
@@ -63,36 +143,342 @@ def place_ship_at(row, col, hor, lth, flt):
     '''
     return flt + [(row, col, hor, lth, set())]
 
-def randomly_place_all_ships():
+def legal_slots(rows=ROWS, cols=COLS, max_length=4):
+    '''
+    returns a tuple of every slot (row, col, hor, lth) at which a ship of length 1 to max_length can be 
+    legally placed in an empty ocean of the given dimensions. The table is built once and shared between calls
+    '''
+    return _slot_table(rows, cols, max_length)[0]
+
+@lru_cache(maxsize=None)
+def _slot_table(rows=ROWS, cols=COLS, max_length=4):
+    '''
+    builds the slot table used by randomly_place_all_ships, returning the tuple of slots, the footprint 
+    and conflict masks of each slot, a dictionary mapping each length to the indices of its slots and,
+    on the standard ocean, the ship code of each slot
+    '''
+    slots = tuple((r, c, h, l) for l in range(1, max_length + 1) for r in range(rows) for c in range(cols)
+                  for h in (False, True) if ok_to_place_ship_at(r, c, h, l, [], rows, cols))
+    # a slot conflicts with every slot whose footprint meets its halo, so the halo mask doubles as its conflict set
+    footprints = tuple(ship_mask(*i, rows, cols) for i in slots)
+    conflicts = tuple(halo_mask(*i, rows, cols) for i in slots)
+    by_length = {l: tuple(i for i, s in enumerate(slots) if s[3] == l) for l in range(1, max_length + 1)}
+    codes = bytes(encode_ship(*i[:3]) for i in slots) if (rows, cols) == (ROWS, COLS) else None
+    return slots, footprints, conflicts, by_length, codes
+
+def encode_ship(row, col, hor):
+    '''
+    returns the one byte code (0 to 199) of a ship whose first square is given by row and col 
+    and whose orientation is given by hor. The length of the ship is not part of the code
+    '''
+    return (row * 10 + col) << 1 | bool(hor)
+
+def decode_fleet(record, lengths=FLEET):
+    '''
+    returns the fleet encoded by record, a sequence of ship codes as given by encode_ship, 
+    where the i-th ship has the i-th length of lengths
+    '''
+    return [((i >> 1) // 10, (i >> 1) % 10, bool(i & 1), l, set()) for i, l in zip(record, lengths)]
+
+def pack_fleet(flt):
+    '''
+    returns a compact bytes record of flt, two bytes per ship: the ship's code, as given by encode_ship, 
+    followed by its length in the low four bits and its hits in the high four bits, where bit i is set 
+    if the i-th square of the ship is hit. Ships may be at most 4 squares long
+    '''
+    record = bytearray()
+    for row, col, hor, lth, hits in flt:
+        squares = sorted(coords(row, col, hor, lth))
+        info = lth | sum(1 << (i + 4) for i, j in enumerate(squares) if j in hits)
+        record += bytes((encode_ship(row, col, hor), info))
+
+    return bytes(record)
+
+def unpack_fleet(record):
     '''
-    returns a fleet (flt) that is a result of a random legal arrangement of the 10 ships in the ocean. 
-    This function makes use of the functions ok_to_place_ship_at and place_ship_at
+    returns the fleet, in the tuple format, packed into record by pack_fleet
     '''
     flt = []
-    # legal returns the row (r), col (c) and hor (h) arguments of a single legally placed ship, using recursion if necessary
-    legal = lambda r, c, h: [r, c, h] if ok_to_place_ship_at(r, c, h, j, flt) else legal(ri(0, 9), ri(0, 9), bool(ri(0, 1)))
-    for i, j in enumerate(range(4, 0, -1)): # where i represents number of ships with j length
-        for _ in range(i + 1):
-            flt = place_ship_at(*legal(ri(0, 9), ri(0, 9), bool(ri(0, 1))), j, flt)
+    for code, info in zip(record[::2], record[1::2]):
+        row, col, hor, lth = (code >> 1) // 10, (code >> 1) % 10, bool(code & 1), info & 15
+        squares = sorted(coords(row, col, hor, lth))
+        flt.append((row, col, hor, lth, {j for i, j in enumerate(squares) if info >> (i + 4) & 1}))
+
+    return flt
+
+class RandomBlocks(object):
+    '''
+    represents a source of random numbers in [0, 1) drawn from rng, a random.Random (or the random module) or 
+    a NumPy Generator, block numbers at a time rather than one call per number. Each RandomBlocks, like each 
+    generator it wraps, must only be used by one thread: giving every thread its own seeded generator keeps 
+    parallel runs reproducible and free of contention on the lock of the random module
+    '''
+    def __init__(self, rng=random, block=BLOCK):
+        self._rng = rng
+        self._block = block
+        self._numbers = []
+        # a NumPy Generator draws a whole block in one call, and has no randrange method
+        self._numpy = hasattr(rng, "integers")
 
-    return flt            
+    def random(self):
+        '''
+        returns the next random number in [0, 1), drawing a new block when the last one is used up
+        '''
+        if not self._numbers:
+            if self._numpy:
+                self._numbers = self._rng.random(self._block).tolist()
+            else:
+                rand = self._rng.random
+                self._numbers = [rand() for _ in range(self._block)]
+        return self._numbers.pop()
+
+    def randrange(self, n):
+        '''
+        returns a random integer in range(n), which must be at most RANDRANGE_LIMIT: beyond it, scaling a 53-bit 
+        float would noticeably favour some integers over others
+        '''
+        if not 0 < n <= RANDRANGE_LIMIT:
+            raise ValueError(f"RandomBlocks can only draw from a range of 1 to {RANDRANGE_LIMIT} integers, not {n}")
+        return int(self.random() * n)
+
+def _blocks(rng, block=BLOCK):
+    '''
+    returns rng as a RandomBlocks, drawing block numbers at a time if it is not one already
+    '''
+    return rng if isinstance(rng, RandomBlocks) else RandomBlocks(rng, block)
 
-def check_if_hits(row, col, flt):
+def randomly_place_all_ships(rng=random, fleet=FLEET, rows=ROWS, cols=COLS):
+    '''
+    returns a fleet (flt) that is a result of a random legal arrangement of ships of the lengths in fleet
+    in an ocean of the given dimensions. Each ship is drawn uniformly from the slots still legal for its 
+    length. On oceans of up to SLOT_TABLE_LIMIT squares, those slots are kept up to date as ships are placed, 
+    so no proposal is ever rejected. On larger oceans, where a slot table would not fit in memory, random 
+    proposals are checked against the square index of a Fleet instead, which takes constant time per proposal, 
+    and that Fleet is returned. 
+    rng is the source of randomness: a random.Random (or the random module), a NumPy Generator, or a 
+    RandomBlocks, which callers placing many fleets should wrap their generator in once. Raises ValueError 
+    if some ship cannot fit in the ocean, or if the fleet could not be placed after repeated attempts
+    '''
+    if rows * cols > SLOT_TABLE_LIMIT:
+        for lth in fleet:
+            if lth > max(rows, cols):
+                raise ValueError(f"a ship of length {lth} does not fit in a {rows}x{cols} ocean")
+        return _place_sparse(fleet, rows, cols, _blocks(rng))
+
+    slots, _, _, by_length, _ = _slot_table(rows, cols, max(fleet, default=1))
+    for lth in fleet:
+        if not by_length[lth]:
+            raise ValueError(f"a ship of length {lth} does not fit in a {rows}x{cols} ocean")
+    # one number per ship is enough unless the placement starts over
+    return [slots[i] + (set(),) for i in _place_slots(fleet, _blocks(rng, max(len(fleet), 1)), rows, cols)]
+
+def generate_fleets(n, seed=None, chunk_size=4096, rng=None):
+    '''
+    lazily generates n random fleets, drawn as by randomly_place_all_ships, and yields them in chunks of 
+    up to chunk_size fleets. Each chunk is a bytes object holding one record of len(FLEET) ship codes 
+    (see encode_ship) per fleet, which decode_fleet converts back into a fleet. Fleets are drawn from rng 
+    if given, as in randomly_place_all_ships, and are otherwise reproducible for a given seed. Raises ValueError, 
+    when called rather than once iterated, if n is negative or chunk_size is not positive
+    '''
+    if n < 0:
+        raise ValueError(f"the number of fleets must not be negative, not {n}")
+    if chunk_size < 1:
+        raise ValueError(f"the chunk size must be positive, not {chunk_size}")
+    return _generate_fleets(n, chunk_size, _blocks(random.Random(seed) if rng is None else rng))
+
+def _generate_fleets(n, chunk_size, rng):
+    '''
+    yields the chunks of n random fleets described in generate_fleets, drawing from rng, a RandomBlocks
+    '''
+    codes = _slot_table(ROWS, COLS, max(FLEET))[4]
+    while n > 0:
+        chunk = bytearray()
+        for _ in range(min(n, chunk_size)):
+            chunk += bytes(codes[i] for i in _place_slots(FLEET, rng))
+        n -= chunk_size
+        yield bytes(chunk)
+
+def _place_slots(lengths, rng, rows=ROWS, cols=COLS):
+    '''
+    returns the indices of the slots of the slot table on which ships of the given lengths are placed, 
+    in order, drawing from rng, a RandomBlocks. A placement can only fail if an earlier ship leaves no room 
+    for a later one, in which case it starts over. Raises ValueError once it has started over RESTARTS times
+    '''
+    for attempts in range(1, RESTARTS + 1):
+        placed = _try_place_slots(lengths, rng, rows, cols)
+        if placed is not None:
+            if instrument.enabled:
+                _record_placement(attempts)
+            return placed
+
+    raise ValueError(f"the fleet could not be placed in the ocean in {RESTARTS} attempts")
+
+def _record_placement(attempts):
+    '''
+    records, when instrumentation is on, a fleet placed after the given number of attempts
+    '''
+    instrument.count("placements")
+    instrument.count("placement_retries", attempts - 1)
+    instrument.maximum("placement_attempts", attempts)
+
+def _try_place_slots(lengths, rng, rows=ROWS, cols=COLS):
+    '''
+    places ships of the given lengths, in order, on slots sampled from the slot table. Returns the 
+    indices of the chosen slots, or None if some ship is left without a legal slot
+    '''
+    slots, footprints, conflicts, by_length, _ = _slot_table(rows, cols, max(lengths, default=1))
+    candidates = {l: by_length[l] for l in set(lengths)}
+    placed = []
+    for i, lth in enumerate(lengths):
+        cand = candidates[lth]
+        if not cand:
+            return None
+
+        s = cand[int(rng.random() * len(cand))]
+        placed.append(s)
+        # removes every slot that conflicts with the new ship from the candidates of the ships still to be placed
+        halo = conflicts[s]
+        for l in set(lengths[i + 1:]):
+            candidates[l] = [j for j in candidates[l] if not footprints[j] & halo]
+
+    return placed
+
+def _place_sparse(lengths, rows, cols, rng, attempts=10000, restarts=100):
+    '''
+    returns a Fleet of ships of the given lengths placed, in order, by drawing slots uniformly at random 
+    until one is legal, from rng, a RandomBlocks. A ship drawn attempts times without success starts the 
+    placement over, and ValueError is raised once it has started over restarts times
+    '''
+    rand = rng.random
+    for tries in range(1, restarts + 1):
+        flt = Fleet(rows=rows, cols=cols)
+        for lth in lengths:
+            for _ in range(attempts):
+                row, col, hor = int(rand() * rows), int(rand() * cols), rand() < 0.5
+                if flt.ok_to_place_ship_at(row, col, hor, lth):
+                    flt.place_ship_at(row, col, hor, lth)
+                    break
+            else:
+                break
+        else:
+            if instrument.enabled:
+                _record_placement(tries)
+            return flt
+
+    raise ValueError(f"the fleet could not be placed in the ocean in {restarts} attempts")
+
+class Fleet(list):
+    '''
+    represents a fleet as a list of ships in an ocean of the given dimensions, that also keeps a sparse index 
+    from each occupied square to the ship occupying it, and a count of the squares of the fleet not yet hit. 
+    Placement checks, shots, sinks and the end of the game are all resolved in constant time, whatever the size 
+    of the ocean or of the fleet. Ships must only be added through place_ship_at and only be hit through the Fleet 
+    (or the functions check_if_hits, hit and are_unsunk_ships_left) for the index and count to stay accurate
+    '''
+    def __init__(self, flt=(), rows=ROWS, cols=COLS):
+        super().__init__()
+        self.rows, self.cols = rows, cols
+        self._index = {}
+        self._unhit = 0
+        for ship in flt:
+            self._add(ship)
+
+    def _add(self, ship):
+        '''
+        appends ship to the fleet and indexes its squares
+        '''
+        self.append(ship)
+        for cell in coords(*ship[:4]):
+            self._index.setdefault(cell, ship) # as in hit, the first ship listed at a square takes the shot
+        self._unhit += ship[3] - len(ship[4])
+
+    def is_open_sea(self, row, col):
+        '''
+        returns Boolean value, which is True if the square given by row and col neither contains nor is 
+        adjacent (horizontally, vertically, or diagonally) to some ship of the fleet, and False otherwise
+        '''
+        return not any((i, j) in self._index for i in range(row - 1, row + 2) for j in range(col - 1, col + 2))
+
+    def ok_to_place_ship_at(self, row, col, hor, lth):
+        '''
+        returns Boolean value, which is True if the ship specified by row, col, hor and lth lies within 
+        the ocean and is open sea at each of its squares, and False otherwise
+        '''
+        last_row, last_col = (row, col + lth - 1) if hor else (row + lth - 1, col)
+        if row < 0 or col < 0 or last_row >= self.rows or last_col >= self.cols:
+            return False
+
+        # walks the squares directly rather than through _footprint, as most random proposals are rejected
+        # and would only fill its cache
+        d_row, d_col = (0, 1) if hor else (1, 0)
+        return all(self.is_open_sea(row + i * d_row, col + i * d_col) for i in range(lth))
+
+    def place_ship_at(self, row, col, hor, lth):
+        '''
+        adds the ship specified by row, col, hor and lth to the fleet, and returns it. 
+        It may be assumed that the resulting arrangement is legal
+        '''
+        ship = (row, col, hor, lth, set())
+        self._add(ship)
+        return ship
+
+    def check_if_hits(self, row, col):
+        '''
+        returns Boolean value, which is True if the shot at the square represented by row and col hits 
+        a ship of the fleet that has not already been hit there, and False otherwise
+        '''
+        ship = self._index.get((row, col))
+        return ship is not None and (row, col) not in ship[4]
+
+    def hit(self, row, col):
+        '''
+        records the shot at the square represented by row and col, and returns the ship it hits, 
+        or None if it hits no ship
+        '''
+        if instrument.enabled:
+            instrument.count("shots")
+        ship = self._index.get((row, col))
+        if ship is not None and (row, col) not in ship[4]:
+            ship[4].add((row, col))
+            self._unhit -= 1
+        return ship
+
+    def are_unsunk_ships_left(self):
+        '''
+        returns Boolean value, which is True if some ship of the fleet is not yet sunk, and False otherwise
+        '''
+        return self._unhit > 0
+
+def check_if_hits(row, col, flt, rows=ROWS, cols=COLS):
     '''
     returns Boolean value, which is True if the shot of the human player at the square 
-    represented by row and col hits any of the ships of flt, and False otherwise
+    represented by row and col hits any of the ships of flt, in an ocean of the given dimensions, 
+    and False otherwise
     '''
+    indexed = _indexed(flt, rows, cols)
+    if indexed is not None:
+        return indexed.check_if_hits(row, col)
+
+    shot = cell_mask(row, col, rows, cols)
     # checks whether the shot given by row and col both hits a ship and is already in any ship's set of hits
-    return any([(row, col) in coords(*i[:4]) and not (row, col) in i[4] for i in flt])
+    return any(ship_mask(*i[:4], rows, cols) & shot and not (row, col) in i[4] for i in flt)
 
-def hit(row, col, flt):
+def hit(row, col, flt, rows=ROWS, cols=COLS):
     '''
-    returns a tuple (flt1, ship) where ship is the ship from the fleet, flt, that receives a hit 
-    by the shot at the square represented by row and col, and flt1 is the fleet resulting from 
-    this hit. It may be assumed that shooting at the square row, col results in of some ship in flt
+    returns a tuple (flt1, ship) where ship is the ship from the fleet, flt, in an ocean of the given 
+    dimensions, that receives a hit by the shot at the square represented by row and col, and flt1 is 
+    the fleet resulting from this hit. It may be assumed that shooting at the square row, col results in 
+    of some ship in flt
     '''
+    indexed = _indexed(flt, rows, cols)
+    if indexed is not None:
+        return flt, indexed.hit(row, col)
+
+    if instrument.enabled:
+        instrument.count("shots")
+    shot = cell_mask(row, col, rows, cols)
     for i in flt:
-        if (row, col) in coords(*i[:4]): # checks if the row and col values coincide with any coords of ships in flt
+        if ship_mask(*i[:4], rows, cols) & shot: # checks if the row and col values coincide with any coords of ships in flt
             i[4].add((row, col))
             return flt, i
 
@@ -101,36 +487,193 @@ def are_unsunk_ships_left(flt):
     returns Boolean value, which is True if there are ships in the fleet 
     that are still not sunk, and False otherwise
     '''
+    if isinstance(flt, Fleet):
+        return flt.are_unsunk_ships_left()
+
     return not all([is_sunk(i) for i in flt])
 
-def main():
+# outcomes of a shot, as returned by GameState.shoot
+REPEAT, MISS, HIT, SUNK = -1, 0, 1, 2
+# message shown to the player, by both front ends, for each outcome of a shot other than SUNK
+MESSAGES = {
+    REPEAT: "You've already shot at that cell!",
+    MISS: "You missed!",
+    HIT: "You have a hit!"
+}
+
+class GameState(object):
+    '''
+    represents a game in progress against a fleet, and is the single engine behind both the command line 
+    and the pygame front ends. The outcome of every square shot at is kept in a per-square array, so each 
+    shot, including a repeated one, is resolved in constant time through the square index of the Fleet
+    '''
+    def __init__(self, flt, rows=ROWS, cols=COLS):
+        self.fleet = flt if isinstance(flt, Fleet) else Fleet(flt, rows, cols)
+        self._cols = self.fleet.cols
+        self._cells = [None] * (self.fleet.rows * self.fleet.cols) # outcome of the shots at each square, if any
+        self._shots = 0
+
+    def shoot(self, row, col):
+        '''
+        fires a shot at the square given by row and col and returns (outcome, ship), where outcome is one of 
+        REPEAT, MISS, HIT or SUNK and ship is the ship at the square, or None if there is none. A repeated 
+        shot counts towards the shots required but changes nothing else
+        '''
+        if not (0 <= row < self.fleet.rows and 0 <= col < self.fleet.cols):
+            raise ValueError(f"square ({row}, {col}) is outside the ocean")
+
+        # the shot is counted, when instrumentation is on, by Fleet.hit
+        self._shots += 1
+        i = row * self._cols + col
+        if self._cells[i] is not None:
+            return REPEAT, self.fleet.hit(row, col)
+
+        ship = self.fleet.hit(row, col)
+        if ship is None:
+            self._cells[i] = MISS
+            return MISS, None
+        if not is_sunk(ship):
+            self._cells[i] = HIT
+            return HIT, ship
+
+        for r, c in _footprint(*ship[:4]):
+            self._cells[r * self._cols + c] = SUNK
+        return SUNK, ship
+
+    def cell(self, row, col):
+        '''
+        returns the outcome (MISS, HIT or SUNK, if the ship there has since sunk) of the shots at the square 
+        given by row and col, or None if it has not been shot at
+        '''
+        return self._cells[row * self._cols + col]
+
+    def shots(self):
+        '''
+        returns the number of shots fired so far
+        '''
+        return self._shots
+
+    def over(self):
+        '''
+        returns Boolean value, which is True once every ship of the fleet is sunk, and False otherwise
+        '''
+        return not self.fleet.are_unsunk_ships_left()
+
+TRACE = {REPEAT: "r", MISS: ".", HIT: "h", SUNK: "s"} # character for the outcome of each shot in a trace
+
+def play_batch(lines, rng=random, trace=False):
+    '''
+    plays one game per line of lines, each against a new fleet drawn from rng (as in randomly_place_all_ships), 
+    shooting at the squares given by the line as whitespace separated pairs of row and column until the fleet 
+    sinks. Shots left after the end of the game are ignored, and blank lines are skipped. Yields one result per 
+    game, as the tab separated game number, shots fired, 1 if the fleet sank and 0 otherwise, and the numbers 
+    of the shots that hit and of those that sank a ship (comma separated, or "-" if none), followed, if trace 
+    is True, by one character per shot from TRACE. Raises ValueError on a line that is not pairs of squares 
+    of the ocean
+    '''
+    rng = _blocks(rng)
+    game = 0
+    for number, line in enumerate(lines, 1):
+        try:
+            squares = list(map(int, line.split()))
+        except ValueError:
+            raise ValueError(f"line {number}: shots must be integers") from None
+        if not squares:
+            continue
+        if len(squares) % 2:
+            raise ValueError(f"line {number}: a shot is missing its column")
+
+        state = GameState(randomly_place_all_ships(rng))
+        outcomes = []
+        try:
+            for row, col in zip(squares[::2], squares[1::2]):
+                outcomes.append(state.shoot(row, col)[0])
+                if state.over():
+                    break
+        except ValueError as e:
+            raise ValueError(f"line {number}: {e}") from None
+
+        hits = ",".join(str(i) for i, j in enumerate(outcomes, 1) if j == HIT or j == SUNK) or "-"
+        sinks = ",".join(str(i) for i, j in enumerate(outcomes, 1) if j == SUNK) or "-"
+        result = f"{game}\t{state.shots()}\t{int(state.over())}\t{hits}\t{sinks}"
+        yield result + "\t" + "".join(TRACE[i] for i in outcomes) if trace else result
+        game += 1
+
+def run_batch(source, output, seed=None, trace=False):
+    '''
+    reads the whole of the stream source in one go, plays its games as play_batch does, with fleets 
+    reproducible for a given seed, and writes their results to the stream output BATCH_FLUSH games at a time. 
+    If a line raises ValueError, the results of the games before it may already have been written to output
+    '''
+    results = []
+    for result in play_batch(source.read().splitlines(), RandomBlocks(random.Random(seed)), trace):
+        results.append(result)
+        if len(results) == BATCH_FLUSH:
+            output.write("\n".join(results) + "\n")
+            results = []
+    if results:
+        output.write("\n".join(results) + "\n")
+
+def _run_batch_to_file(source, path, seed=None, trace=False):
+    '''
+    runs run_batch with its results written to the file at path, which is only created, or replaced, once 
+    every game has been played, so that a batch failing part way through leaves no truncated results behind
+    '''
+    fd, partial = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".partial")
+    try:
+        with os.fdopen(fd, "w") as output:
+            run_batch(source, output, seed, trace)
+        os.replace(partial, path)
+    except BaseException:
+        os.remove(partial)
+        raise
+
+def main(argv=None):
     '''
     Prompts the user to call out rows and columns of shots and outputs the computer's responses iteratively until the game stops.
-    When game is over, outputs the number of shots required. 
+    When game is over, outputs the number of shots required. With --batch, plays the games of a file of shots instead (see play_batch), 
+    and exits with an error message, writing no results file, if the file of shots cannot be read or one of its lines is malformed.
     '''
-    fleet = randomly_place_all_ships()
-    run = True
-    shots = 0
-    while run:
+    parser = argparse.ArgumentParser(description="Play battleships against the computer.")
+    parser.add_argument("--batch", nargs="?", const="-", metavar="FILE", 
+                        help="play one game per line of shots in FILE (default: standard input) without prompts")
+    parser.add_argument("-o", "--output", default="-", help="file the batch results are written to (default: standard output)")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="seed of the fleets of the batch games")
+    parser.add_argument("--trace", action="store_true", help="add the outcome of every shot to the batch results")
+    args = parser.parse_args(argv)
+    if args.batch is not None:
+        try:
+            source = sys.stdin if args.batch == "-" else open(args.batch)
+        except OSError as e:
+            sys.exit(f"{args.batch}: {e.strerror}")
+        try:
+            if args.output == "-":
+                run_batch(source, sys.stdout, args.seed, args.trace)
+            else:
+                _run_batch_to_file(source, args.output, args.seed, args.trace)
+        except ValueError as e:
+            sys.exit(str(e))
+        except OSError as e:
+            sys.exit(f"{args.output}: {e.strerror}")
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        return
+
+    state = GameState(randomly_place_all_ships())
+    while not state.over():
         inp = input("Enter row (0-9) and column (0-9) to shoot, separated by a single space, or 'quit' to exit the game: ")
         if re.match(r"^[0-9] [0-9]$", inp): # makes sure input is two single digit numbers separated by a single space
             row, col = map(int, inp.split())    
-            shots += 1
-            if check_if_hits(row, col, fleet):
-                (fleet, ship_hit) = hit(row, col, fleet)
-                print("You sank a " + ship_type(ship_hit) + "!") if is_sunk(ship_hit) else print("You have a hit!")
-            else:
-                print("You missed!")
+            outcome, ship_hit = state.shoot(row, col)
+            print("You sank a " + ship_type(ship_hit) + "!") if outcome == SUNK else print(MESSAGES[outcome])
                 
         elif inp == "quit":
             return
         else:
             print("That's not a valid input!")
-        
-        if not are_unsunk_ships_left(fleet): 
-            run = False
             
-    print(f"Game over! You required {shots} shots.")
+    print(f"Game over! You required {state.shots()} shots.")
 
 if __name__ == '__main__':
    main()
@@ -1,6 +1,12 @@
+import time
+START = time.perf_counter() # start of the process, as far as the start-up report is concerned
+import argparse, io, json, sys, os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
 import pygame as pg
-from battleships import randomly_place_all_ships
-import sys, os
+from battleships import randomly_place_all_ships, GameState, ROWS, COLS, MISS, REPEAT, SUNK, MESSAGES
+import instrument
 
 #constants
 SCREEN_WIDTH = 640
@@ -10,11 +16,106 @@ CELL_SIZE = 32
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 FANFARE_END = pg.USEREVENT + 1 # custom event for Game's running loop 
+FPS = 60 # frame rate while an animation is running
+FADE_DURATION = 2000 # milliseconds the screen takes to fade to black once the game is over
+IDLE_TIMEOUT = 1000 # longest time, in milliseconds, the idle loop blocks waiting for an event
+FONT_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "battleships", "fonts.json") # resolved system fonts, kept between runs
+
+#assets
+# each asset is loaded, decoded and converted once per process, then shared by every sprite and every game
+
+def asset_path(*parts):
+    '''
+    returns the path of the asset given by parts, relative to the working directory
+    '''
+    return os.path.join(os.getcwd(), *parts)
+
+@lru_cache(maxsize=None)
+def load_image(*parts):
+    '''
+    returns the image at the path given by parts, converted to the pixel format of the display
+    '''
+    if instrument.enabled:
+        instrument.count("sprites_loaded")
+    return pg.image.load(asset_path(*parts)).convert_alpha()
+
+@lru_cache(maxsize=None)
+def load_sound(volume, *parts):
+    '''
+    returns the sound at the path given by parts, set to the given volume
+    '''
+    if instrument.enabled:
+        instrument.count("sounds_loaded")
+    sound = pg.mixer.Sound(asset_path(*parts))
+    sound.set_volume(volume)
+    return sound
+
+def _font_paths():
+    '''
+    returns the dictionary of resolved system fonts kept in FONT_CACHE, or an empty one if there is none
+    '''
+    try:
+        with open(FONT_CACHE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+@lru_cache(maxsize=None)
+def load_music(*parts):
+    '''
+    returns the contents of the music file at the path given by parts, read into memory so that starting 
+    a track does not wait on the disk
+    '''
+    with open(asset_path(*parts), "rb") as f:
+        return f.read()
+
+@lru_cache(maxsize=None)
+def load_font(name, size, bold=False):
+    '''
+    returns the system font of the given name, size and weight. pg.font.SysFont, which enumerates every font 
+    installed, is only asked to resolve a font the first time it is used on a machine: the file it resolves to, 
+    or None for pygame's default font, is kept in FONT_CACHE. Deleting that file looks the fonts up again
+    '''
+    key = f"{name}:{int(bold)}"
+    paths = _font_paths()
+    if key in paths and (paths[key][0] is None or os.path.exists(paths[key][0])):
+        path, fake_bold = paths[key]
+    else:
+        # a constructor that records, rather than opens, the file SysFont resolves and whether it must embolden it
+        path, fake_bold = pg.font.SysFont(name, size, bold, constructor=lambda path, size, bold, italic: (path, bold))
+        paths[key] = [path, fake_bold]
+        try:
+            os.makedirs(os.path.dirname(FONT_CACHE), exist_ok=True)
+            with open(FONT_CACHE, "w") as f:
+                json.dump(paths, f)
+        except OSError:
+            pass # the font is simply looked up again next time
+
+    font = pg.font.Font(path, size)
+    font.set_bold(fake_bold)
+    return font
+
+@lru_cache(maxsize=128)
+def render_text(font, text, colour):
+    '''
+    returns the surface of text rendered, antialiased, in font and colour. Each distinct text is rendered once 
+    and then shared, so redrawing a message allocates nothing
+    '''
+    return font.render(text, True, colour)
+
+def clear_assets():
+    '''
+    forgets every asset loaded so far. Must be called before pygame is shut down if it is to be started again
+    in the same process, as the surfaces, sounds and fonts kept do not survive pg.quit
+    '''
+    for i in (load_image, load_sound, load_font, render_text):
+        i.cache_clear()
 
 #classes
-class GridIcon(pg.sprite.Sprite):
+class GridIcon(pg.sprite.DirtySprite):
     '''
-    base representation of all possible grid objects 
+    base representation of all possible grid objects. Grid objects are dirty sprites, redrawn only when 
+    they first appear or when a sprite they overlap changes
     '''
     def __init__(self, row, col):
         super().__init__()
@@ -28,8 +129,7 @@ class GridIcon(pg.sprite.Sprite):
         loads and returns the appropriate icon to display on grid 
         '''
         # loads the path to the appropriate sprite icon by utilising Ship/Hit's string method and 0/1 value of Ship/Hit's ext variable
-        img = pg.image.load(os.path.join(os.getcwd(), "sprites", f"{self}{self._ext}.png"))
-        return img.convert_alpha()
+        return load_image("sprites", f"{self}{self._ext}.png")
 
     def position(self):
         '''
@@ -48,25 +148,12 @@ class Ship(GridIcon):
         self._hit = set()
         super().__init__(row, col)
 
-    def already_hit(self, shot):
-        '''
-        returns Boolean value indicating whether the given shot, already exists in the ship's set of hits
-        '''
-        # checks through set of hits to determine whether the shot is already there
-        return any(map(lambda hit: (hit._row, hit._col) == shot, self._hit)) 
-
     def add_hit(self, shot):
         '''
         adds shot to set of ship's hits
         '''
         self._hit.add(shot)
 
-    def is_sinking(self):
-        '''
-        returns Boolean value indicating whether the ship has received as many hits as it is long
-        '''
-        return self._lth == len(self._hit)
-
     def sink(self):
         '''
         'kills' all hit sprites in the ship's set of hits, removing them from the vis_sprites group in so doing
@@ -109,15 +196,20 @@ class Log(object):
         self._log_topleft = (45, 545)
         # value determined by whether the game is over (larger font for game over message)
         self._font =  {
-            0: pg.font.SysFont("Bahnschrift", 11, bold=True),
-            1: pg.font.SysFont("Bahnschrift", 18)
+            0: load_font("Bahnschrift", 11, bold=True),
+            1: load_font("Bahnschrift", 18)
         }
+        self.sprite = pg.sprite.DirtySprite() # shows the in-game message, re-rendered only when the message changes
+        self.set_symbol(None)
 
     def set_symbol(self, symbol):
         '''
         sets symbol that will determine the in-game message displayed to user
         '''
         self._symbol = symbol
+        self.sprite.image, topleft = self.in_game_message()
+        self.sprite.rect = self.sprite.image.get_rect(topleft=topleft)
+        self.sprite.dirty = 1
 
     def in_game_message(self):
         '''
@@ -126,19 +218,15 @@ class Log(object):
         if type(self._symbol) == Ship:
             text = f"You sank a {self._symbol}!"
         else: 
-            text = {
-                -1: "You've already hit that cell!",
-                0: "You missed!",
-                1: "You have a hit!"
-            }.get(self._symbol)
+            text = MESSAGES.get(self._symbol)
 
-        return self._font[0].render(text, True, BLACK), self._log_topleft
+        return render_text(self._font[0], text, BLACK), self._log_topleft
     
     def game_over_message(self, shots):
         '''
         returns 'game over' message, including number of shots required
         '''
-        text = self._font[1].render(f"Game over! You required {shots} shots. Press 'Y' key to play again.", True, WHITE)
+        text = render_text(self._font[1], f"Game over! You required {shots} shots. Press 'Y' key to play again.", WHITE)
         return text, text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)) # centres text
 
 class Audio(object): 
@@ -146,21 +234,19 @@ class Audio(object):
     represents the audio content of the game
     '''
     def __init__(self):
-        self._exp = pg.mixer.Sound(os.path.join(os.getcwd(), "audio", "explosion.wav"))
-        self._exp.set_volume(0.2)
-        self._fan = pg.mixer.Sound(os.path.join(os.getcwd(), "audio", "fanfare.wav"))
-        self._fan.set_volume(0.8)
-        # value determined by whether the game is over
-        self._music_path = {
-            0: os.path.join(os.getcwd(), "audio", "battleships.ogg"),
-            1: os.path.join(os.getcwd(), "audio", "game_over_audio.ogg")
+        self._exp = load_sound(0.2, "audio", "explosion.wav")
+        self._fan = load_sound(0.8, "audio", "fanfare.wav")
+        # value determined by whether the game is over. The mixer decodes music as it plays it, so only the file is kept
+        self._music = {
+            0: load_music("audio", "battleships.ogg"),
+            1: load_music("audio", "game_over_audio.ogg")
         }
 
     def load_music(self, game_over=False):
         '''
-        returns path to appropriate music depending on whether the game is over or not
+        returns a file object holding the appropriate music depending on whether the game is over or not
         '''
-        return self._music_path[int(game_over)]
+        return io.BytesIO(self._music[int(game_over)])
 
     def explosion(self):
         '''
@@ -177,26 +263,51 @@ class Audio(object):
 
 class Game(object):
     '''
-    represents an instance of the game
+    represents an instance of the game, played against flt or, by default, a freshly generated fleet. 
+    Given an executor, such as a ThreadPoolExecutor, the game prepares its next round in the background 
+    as soon as the fleet is sunk, so that starting it is instantaneous
     '''
-    def __init__(self):
-        self._game_over = False
-        self._shots = 0
-        self._bg = pg.image.load(os.path.join(os.getcwd(), "battleships_bg.png"))
-        self._bg.convert_alpha()
-        self._unsunk_sprites = pg.sprite.Group() # group for unsunk ships (ships that are not yet visible)
-        self._unsunk_sprites.add(*[Ship(*i[:4]) for i in randomly_place_all_ships()]) # generates and adds ships to unsunk_sprites
-        self._vis_sprites = pg.sprite.Group() # group for hits, misses and sunk ships (visible)
+    def __init__(self, flt=None, executor=None):
+        self._bg = load_image("battleships_bg.png")
+        self._audio = Audio()
+        self._executor = executor
+        self._new_round(self.prepare_round(flt))
+
+    def prepare_round(self, flt=None):
+        '''
+        returns the game state, ship sprites, sprite group, fade surface and log of a new round against flt or, 
+        by default, a freshly generated fleet. Has no effect on the round being played, so it may run in the 
+        background
+        '''
+        # resolves every shot, shared with the command line game
+        state = GameState(randomly_place_all_ships() if flt is None else flt)
+        # maps each ship of the fleet, by identity, to the sprite that shows it once sunk
+        ship_sprites = {id(i): Ship(*i[:4]) for i in state.fleet}
+        vis_sprites = pg.sprite.LayeredDirty() # group for hits, misses, sunk ships and the log (visible)
+        vis_sprites.clear(None, self._bg) # the background is repainted wherever a sprite moves or disappears
+        # keeps the group in dirty rectangle mode after its first, full, draw however long a frame takes
+        vis_sprites.set_timing_threshold(float("inf"))
 
         # sets up the fade surface that will fade the screen to black once game is over
-        self._fade_surface = pg.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        self._fade_surface.fill(BLACK)
-        self._fade_surface.set_alpha(0)
-        
-        self._log = Log()
-        self._audio = Audio()
-        pg.mixer.music.load(self._audio.load_music())
+        fade_surface = pg.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        fade_surface.fill(BLACK)
+        fade_surface.set_alpha(0)
+
+        log = Log()
+        vis_sprites.add(log.sprite)
+        return state, ship_sprites, vis_sprites, fade_surface, log
 
+    def _new_round(self, prepared):
+        '''
+        starts the round given by prepared, as returned by prepare_round, and its music
+        '''
+        self._state, self._ship_sprites, self._vis_sprites, self._fade_surface, self._log = prepared
+        self._game_over = False
+        self._faded = False # whether the game over screen has been drawn in full
+        self._fade_start = None # time in milliseconds at which the fade began
+        self._next_round = None # the next round, once it is being prepared
+
+        pg.mixer.music.load(self._audio.load_music(), "ogg")
         pg.mixer.music.set_volume(0.6)
         pg.mixer.music.play(-1)
     
@@ -205,111 +316,215 @@ class Game(object):
         returns Boolean value indicating whether user clicked a cell in the grid
         '''
         # converts the pixel coords of location mouseclick given by row and col, into relative position relative to cells of grid
-        r_shot, c_shot = ((row - GRID_TOP_Y) // 32, (col - GRID_TOP_X) // 32)
+        r_shot, c_shot = ((row - GRID_TOP_Y) // CELL_SIZE, (col - GRID_TOP_X) // CELL_SIZE)
         # checks r_shot and c_shot are within grid range
-        return (r_shot, c_shot) if r_shot in range(10) and c_shot in range(10) else False
-
-    def fleet_hit(self, pos, cell):
-        '''
-        returns Boolean value indicating whether shot hit any unsunk ships
-        '''
-        for i in self._unsunk_sprites:
-            # checks if mouseclick collides with one of the ships in unsunk_ships and that the ship has not been hit already at the given location
-            if i.rect.collidepoint(pos) and not i.already_hit(cell):
-                return i
+        return (r_shot, c_shot) if r_shot in range(ROWS) and c_shot in range(COLS) else False
 
-    def running(self):
+    def running(self, events=None):
         '''
-        checks if user has quit game and if not, processes events and returns Boolean
+        checks if user has quit game and if not, processes events (by default, those queued) and returns Boolean
         indicating whether the user has closed the game window
         '''
-        for event in pg.event.get():
+        for event in pg.event.get() if events is None else events:
             if event.type == pg.QUIT:
                 return False
 
             elif event.type == pg.MOUSEBUTTONDOWN and event.button == 1:
-                pos = pg.mouse.get_pos()
+                pos = event.pos
                 cell = self.cell_clicked(*pos[::-1]) # pos inverted to match x, y with row and col
                 if cell and not self._game_over:
-                    self._shots += 1
                     # runs game_logic once it has been established that user has made a shot and the fleet has not yet been fully sunk
-                    self.game_logic(pos, cell, self.fleet_hit(pos, cell))
+                    self.game_logic(cell)
 
             elif event.type == pg.KEYDOWN and event.unicode.lower() == "y" and self.fade_to_black():
-                self.__init__()
+                self._new_round(self._next_round.result() if self._next_round else self.prepare_round())
             
             elif event.type == FANFARE_END:
-                pg.mixer.music.load(self._audio.load_music(self._game_over))
+                pg.mixer.music.load(self._audio.load_music(self._game_over), "ogg")
                 pg.mixer.music.play(-1)
 
         return True
             
-    def game_logic(self, pos, cell, ship_hit):
+    def game_logic(self, cell):
         '''
-        executes game logic
+        executes game logic for a shot at the grid cell given by cell
         '''
-        shot = Shot(*cell, ship_hit) # creates new instance of Shot
+        outcome, ship_hit = self._state.shoot(*cell)
 
-        if not any([i.rect.collidepoint(pos) for i in self._vis_sprites]): # checks if the same shot has already been made
-            self._vis_sprites.add(shot)
-            self._log.set_symbol(ship_hit != None) # passes Boolean to set_symbol to determine whether shot is a hit
-        else:
+        if outcome == REPEAT: # the same shot has already been made
             self._log.set_symbol(-1) # indicates to log that cell has already been hit
-        
+            return
+
+        shot = Shot(*cell, ship_hit) # creates new instance of Shot
+        self._vis_sprites.add(shot)
+        self._log.set_symbol(outcome != MISS) # passes Boolean to set_symbol to determine whether shot is a hit
+
         if ship_hit:
-            ship_hit.add_hit(shot)
-            if ship_hit.is_sinking():
-                ship_hit.sink()
+            sprite = self._ship_sprites[id(ship_hit)]
+            sprite.add_hit(shot)
+            if outcome == SUNK:
+                sprite.sink()
                 self._audio.explosion()
-                self._vis_sprites.add(ship_hit) # makes the ship visible
-                self._unsunk_sprites.remove(ship_hit)
-                self._log.set_symbol(ship_hit) # indicates to the log that ship_hit has sunk
+                self._vis_sprites.add(sprite) # makes the ship visible
+                self._log.set_symbol(sprite) # indicates to the log that ship_hit has sunk
 
-        if not self._unsunk_sprites:
+        if self._state.over():
            self._game_over = True
+           self._fade_start = pg.time.get_ticks()
            pg.mixer.music.stop()
            self._audio.fanfare()
+           if self._executor:
+               # prepares the next round while the screen fades and the fanfare plays
+               self._next_round = self._executor.submit(self.prepare_round)
 
     def fade_to_black(self):
         '''
         fade screen to black following game over. Returns Boolean indicating whether screen has fully faded to black
         '''
-        if not self._fade_surface.get_alpha() == 255:
-            # increments opacity of black fill surface. When alpha value reaches 254 it increments by 1 to ceiling of 255
-            self._fade_surface.set_alpha(self._fade_surface.get_alpha() + 2) 
+        if self._fade_start is None:
             return False
-        else:
-            return True
+        # sets opacity of black fill surface in proportion to the time elapsed since the game ended, up to 255
+        elapsed = pg.time.get_ticks() - self._fade_start
+        self._fade_surface.set_alpha(min(255, elapsed * 255 // max(FADE_DURATION, 1)))
+        return self._fade_surface.get_alpha() == 255
+
+    def over(self):
+        '''
+        returns Boolean value indicating whether the fleet of the current round has been sunk
+        '''
+        return self._game_over
+
+    def animating(self):
+        '''
+        returns Boolean value indicating whether an animation is running, so that the screen needs timed frames
+        '''
+        return self._game_over and not self._faded
                 
     def update(self, screen):
         '''
-        show results of user action and game logic
+        show results of user action and game logic. Only the regions of the screen that changed are redrawn 
+        and pushed to the display, and nothing is once the screen is static. Returns the list of rects updated
         '''
-        screen.blit(self._bg, (0, 0))
-        self._vis_sprites.draw(screen)
-        screen.blit(*self._log.in_game_message())
-        
+        if self._faded:
+            return []
+
         if self._game_over:
+            # the whole screen changes on every frame of the fade
+            self._vis_sprites.repaint_rect(screen.get_rect())
+            self._vis_sprites.draw(screen)
             screen.blit(self._fade_surface, (0, 0))
             if self.fade_to_black():
                 # draws game over message once the screen has fully faded to black
-                screen.blit(*self._log.game_over_message(self._shots))
+                screen.blit(*self._log.game_over_message(self._state.shots()))
+                self._faded = True
+            rects = [screen.get_rect()]
+        else:
+            rects = self._vis_sprites.draw(screen)
 
-        pg.display.update()
+        if rects:
+            pg.display.update(rects)
+        return rects
 
-def main():
-    pg.mixer.pre_init(44100, -16, 2, 2048) # pre-initialising mixer to reduce audio lag
-    pg.init()
-    pg.mixer.init()
+class Startup(object):
+    '''
+    records how long after the start of the process each stage of start-up completes
+    '''
+    def __init__(self):
+        self._stages = {}
+
+    def mark(self, stage):
+        '''
+        records that the given stage has just completed
+        '''
+        self._stages[stage] = time.perf_counter() - START
+
+    def report(self):
+        '''
+        returns a short report of the stages recorded, in milliseconds
+        '''
+        return "start-up: " + ", ".join(f"{i} {j * 1000:.1f} ms" for i, j in self._stages.items())
+
+    def save(self, path):
+        '''
+        appends the stages recorded, in milliseconds, to the file at path as one JSON line, so that 
+        time to first frame can be tracked across releases
+        '''
+        with open(path, "a") as f:
+            f.write(json.dumps({i: round(j * 1000, 3) for i, j in self._stages.items()}) + "\n")
+
+def preload():
+    '''
+    loads and converts every sprite, sound and piece of music, and returns a freshly generated fleet. 
+    Run in the background while the window already shows the background
+    '''
+    for name in ("battleship", "cruiser", "destroyer", "submarine", "shot"):
+        for ext in (0, 1):
+            load_image("sprites", f"{name}{ext}.png")
+    Audio()
+    return randomly_place_all_ships()
+
+def next_events():
+    '''
+    blocks until an event arrives, or for at most IDLE_TIMEOUT milliseconds, and returns the list of events queued
+    '''
+    event = pg.event.wait(IDLE_TIMEOUT)
+    return [] if event.type == pg.NOEVENT else [event] + pg.event.get()
+
+def main(argv=None):
+    '''
+    parses the command line and runs the game. The window shows the background before anything else is 
+    loaded, and sprites, sounds, music and the first fleet are then prepared in a background thread. While 
+    nothing is animated, the loop sleeps until an event arrives, and it only runs timed frames while an 
+    animation such as the fade to black is playing
+    '''
+    parser = argparse.ArgumentParser(description="Play battleships.")
+    parser.add_argument("--poll", action="store_true", help=f"run {FPS} frames per second even when idle")
+    parser.add_argument("--startup-report", nargs="?", const="-", metavar="PATH",
+                        help="print how long start-up took or, given a path, append it there as a JSON line")
+    args = parser.parse_args(argv)
+    startup = Startup()
+    startup.mark("imports")
+
+    # only the subsystems needed for the first frame are started before it is shown
+    pg.display.init()
+    pg.font.init()
+    clock = pg.time.Clock() # also starts the timer that fades and frame pacing depend on
     pg.display.set_caption("Battleships")
     screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    clock = pg.time.Clock()
-    game = Game()
-    run = True
-    while run:
-        run = game.running() # checks if user has quit and if not calls game_logic if cell_clicked
+    screen.blit(load_image("battleships_bg.png"), (0, 0))
+    pg.display.update()
+    startup.mark("first frame")
+
+    pg.mixer.pre_init(44100, -16, 2, 2048) # pre-initialising mixer to reduce audio lag
+    pg.mixer.init()
+    startup.mark("mixer")
+    with ThreadPoolExecutor(max_workers=1) as executor: # loads the first round, then prepares each next one
+        loading = executor.submit(preload)
+        events = [] # events that arrive while loading, handled once the game is ready
+        while not loading.done():
+            events += pg.event.get()
+            if any(i.type == pg.QUIT for i in events):
+                return
+            pg.time.wait(1000 // FPS)
+        game = Game(loading.result(), executor)
+        startup.mark("game ready")
+        if args.startup_report == "-":
+            print(startup.report(), file=sys.stderr)
+        elif args.startup_report:
+            startup.save(args.startup_report)
+
+        run = game.running(events + pg.event.get())
         game.update(screen)
-        clock.tick(60)
+        while run:
+            timed = args.poll or game.animating()
+            events = None if timed else next_events() # None processes the events queued
+            start = time.perf_counter() # neither waiting for events nor pacing is part of the frame
+            run = game.running(events) # checks if user has quit and if not calls game_logic if cell_clicked
+            game.update(screen)
+            if instrument.enabled:
+                instrument.observe("frame", time.perf_counter() - start)
+            # when idle, keeps the clock current, so the first animated frame is not paced against an old tick
+            clock.tick(FPS if timed else 0)
 
 if __name__ == "__main__":
     main()
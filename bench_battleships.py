@@ -0,0 +1,182 @@
+import argparse, json, os, platform, random, sys, time
+from battleships import (FLEET, Fleet, legal_slots, randomly_place_all_ships, ok_to_place_ship_at, is_open_sea,
+                         check_if_hits, hit)
+from simulate import simulate
+
+HISTORY = "bench_history.json" # every run recorded, oldest first
+BASELINE = "bench_baseline.json" # the run later runs are compared against
+TOLERANCE = 0.10 # largest fall in throughput, as a fraction of the baseline, that is not a regression
+SETTINGS = ("scale", "seed", "python") # settings two runs must share for their throughputs to be compared
+
+def _placement(n, seed):
+    '''
+    returns a function placing n fleets
+    '''
+    def work():
+        rng = random.Random(seed)
+        return [randomly_place_all_ships(rng) for _ in range(n)]
+    return work
+
+def _queries(n, seed):
+    '''
+    returns n (slot, partial fleet) pairs: slots anywhere around the ocean, checked against the first
+    ships of random fleets
+    '''
+    rng = random.Random(seed)
+    fleets = [randomly_place_all_ships(rng) for _ in range(64)]
+    slots = legal_slots() + tuple((rng.randrange(-1, 11), rng.randrange(-1, 11), rng.random() < 0.5,
+                                   rng.randrange(1, 5)) for _ in range(100))
+    return [(rng.choice(slots), rng.choice(fleets)[:rng.randrange(len(FLEET))]) for _ in range(n)]
+
+def _ok_to_place(n, seed):
+    '''
+    returns a function making n calls of ok_to_place_ship_at
+    '''
+    queries = _queries(n, seed)
+    return lambda: [ok_to_place_ship_at(*slot, flt) for slot, flt in queries]
+
+def _open_sea(n, seed):
+    '''
+    returns a function making n calls of is_open_sea
+    '''
+    queries = _queries(n, seed)
+    return lambda: [is_open_sea(slot[0], slot[1], flt) for slot, flt in queries]
+
+def _shots(wrap):
+    '''
+    returns a benchmark of shots resolved with check_if_hits and hit, against fleets wrapped by wrap
+    '''
+    def shots(n, seed):
+        '''
+        returns a function shooting at every square of n // 100 fleets
+        '''
+        rng = random.Random(seed)
+        fleets = [wrap(randomly_place_all_ships(rng)) for _ in range(max(1, n // 100))]
+        cells = [(r, c) for r in range(10) for c in range(10)]
+        def work():
+            for flt in fleets:
+                for row, col in cells:
+                    if check_if_hits(row, col, flt):
+                        hit(row, col, flt)
+        return work
+    return shots
+
+def _games(strategy):
+    '''
+    returns a benchmark of whole simulated games played by strategy
+    '''
+    return lambda n, seed: lambda: simulate(n, seed, strategy)
+
+# maps each benchmark to the function that sets it up, and to the number of operations it times
+BENCHMARKS = {
+    "randomly_place_all_ships": (_placement, 2000),
+    "ok_to_place_ship_at": (_ok_to_place, 20000),
+    "is_open_sea": (_open_sea, 20000),
+    "check_if_hits/hit (list)": (_shots(list), 20000),
+    "check_if_hits/hit (Fleet)": (_shots(Fleet), 20000),
+    "games (random)": (_games("random"), 200),
+    "games (density)": (_games("density"), 50)
+}
+
+def run_benchmarks(names=None, scale=1.0, seed=0, repeat=5):
+    '''
+    runs the benchmarks given by names (by default, all of them), each timing scale times its number of
+    operations with a fixed seed, and returns a dictionary mapping each one to its throughput in operations
+    per second, the best of repeat runs. Setting up each run is not timed
+    '''
+    results = {}
+    for name in names or BENCHMARKS:
+        setup, ops = BENCHMARKS[name]
+        n = max(1, int(ops * scale))
+        if name.startswith("check_if_hits"):
+            n = max(100, n - n % 100) # a whole number of fleets
+        best = float("inf")
+        for _ in range(repeat):
+            work = setup(n, seed)
+            start = time.perf_counter()
+            work()
+            best = min(best, time.perf_counter() - start)
+        results[name] = n / best
+
+    return results
+
+def compare(baseline, current, tolerance=TOLERANCE):
+    '''
+    returns a list of (name, ratio, regressed) triples, one per benchmark in both baseline and current
+    (dictionaries of throughputs), where ratio is the current throughput over the baseline one and regressed
+    is True if it fell by more than tolerance
+    '''
+    return [(name, current[name] / baseline[name], current[name] < baseline[name] * (1 - tolerance))
+            for name in baseline if name in current]
+
+def mismatched_settings(baseline, current):
+    '''
+    returns the list of the SETTINGS that differ between the records baseline and current, which makes
+    comparing their throughputs meaningless
+    '''
+    return [i for i in SETTINGS if baseline.get(i) != current.get(i)]
+
+def load(path, default=None):
+    '''
+    returns the JSON contents of the file at path, or default if there is no such file
+    '''
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+def save(path, data):
+    '''
+    writes data to the file at path as JSON
+    '''
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+def main(argv=None):
+    '''
+    parses the command line to run the benchmarks, recording them in the history, or to compare the latest
+    run against the baseline. Exits with status 1 if compare finds a regression
+    '''
+    parser = argparse.ArgumentParser(description="Benchmark the battleships rules engine.")
+    parser.add_argument("--history", default=HISTORY, help="JSON file every run is appended to")
+    parser.add_argument("--baseline", default=BASELINE, help="JSON file holding the baseline run")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the benchmarks and append the results to the history")
+    run.add_argument("-b", "--bench", action="append", choices=sorted(BENCHMARKS), help="benchmark to run (default: all)")
+    run.add_argument("--scale", type=float, default=1.0, help="factor applied to the work of each benchmark")
+    run.add_argument("-r", "--repeat", type=int, default=5, help="number of runs of each benchmark, the best one counting")
+    run.add_argument("-s", "--seed", type=int, default=0, help="seed of the fleets and games")
+    run.add_argument("--label", default="", help="label stored with the results, such as a version")
+    run.add_argument("--save-baseline", action="store_true", help="also store the results as the baseline")
+    check = commands.add_parser("compare", help="compare the latest run in the history against the baseline")
+    check.add_argument("--tolerance", type=float, default=TOLERANCE, help="largest fall in throughput allowed, as a fraction")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run_benchmarks(args.bench, args.scale, args.seed, args.repeat)
+        for name, i in results.items():
+            print(f"{name:28} {i:14,.0f} ops/s")
+        record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "label": args.label, "python": platform.python_version(),
+                  "scale": args.scale, "seed": args.seed, "results": results}
+        save(args.history, load(args.history, []) + [record])
+        if args.save_baseline:
+            save(args.baseline, record)
+        return
+
+    history, baseline = load(args.history, []), load(args.baseline)
+    if not history or baseline is None:
+        sys.exit("compare needs a history and a baseline: use run and run --save-baseline first")
+    mismatched = mismatched_settings(baseline, history[-1])
+    if mismatched:
+        sys.exit("the latest run and the baseline differ in " + ", ".join(
+            f"{i} ({baseline.get(i)} against {history[-1].get(i)})" for i in mismatched) + ": rerun one of them to match")
+    regressed = False
+    for name, ratio, worse in compare(baseline["results"], history[-1]["results"], args.tolerance):
+        print(f"{name:28} {ratio:7.2f}x{'  REGRESSION' if worse else ''}")
+        regressed |= worse
+    if regressed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
+    sys.exit()
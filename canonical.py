@@ -0,0 +1,138 @@
+import hashlib, sqlite3
+from functools import lru_cache
+from battleships import coords, encode_ship, decode_fleet
+from corpus import Corpus, CorpusWriter
+
+# the 8 symmetries of the square ocean, each mapping a square (row, col) to its image
+SYMMETRIES = (
+    lambda r, c: (r, c),
+    lambda r, c: (c, 9 - r),
+    lambda r, c: (9 - r, 9 - c),
+    lambda r, c: (9 - c, r),
+    lambda r, c: (r, 9 - c),
+    lambda r, c: (9 - r, c),
+    lambda r, c: (c, r),
+    lambda r, c: (9 - c, 9 - r)
+)
+
+@lru_cache(maxsize=None)
+def _images(lth):
+    '''
+    returns a tuple holding, for each symmetry, a dictionary mapping the code of every ship of length lth
+    to the code of its image. Submarines always map to the horizontal code, as their orientation is cosmetic
+    '''
+    images = tuple({} for _ in SYMMETRIES)
+    for code in range(200):
+        row, col, hor = (code >> 1) // 10, (code >> 1) % 10, bool(code & 1)
+        squares = coords(row, col, hor, lth)
+        if not all(r in range(10) and c in range(10) for r, c in squares):
+            continue
+        for t, f in enumerate(SYMMETRIES):
+            moved = sorted(f(r, c) for r, c in squares)
+            images[t][code] = encode_ship(*moved[0], lth == 1 or moved[0][0] == moved[-1][0])
+
+    return images
+
+def canonical_form(flt):
+    '''
+    returns (record, t) where record is the canonical form of flt under the symmetries of the ocean, and t is
+    the index in SYMMETRIES of a symmetry taking flt to it. The record holds one ship code per ship, longest
+    ships first and ships of the same length in increasing code order, and is the smallest such record over
+    all 8 images of flt, so that two fleets have the same canonical form if and only if one is an image of
+    the other (taking ships of the same length, and the orientation of submarines, to be interchangeable)
+    '''
+    ships = sorted(((i[3], encode_ship(*i[:3])) for i in flt), key=lambda i: -i[0])
+    best = None
+    for t in range(len(SYMMETRIES)):
+        record = []
+        start = 0
+        while start < len(ships):
+            # sorts the images of each run of ships of the same length
+            end = start
+            while end < len(ships) and ships[end][0] == ships[start][0]:
+                end += 1
+            images = _images(ships[start][0])[t]
+            record += sorted(images[code] for _, code in ships[start:end])
+            start = end
+        record = bytes(record)
+        if best is None or record < best[0]:
+            best = (record, t)
+
+    return best
+
+def canonical_fleet(flt):
+    '''
+    returns the fleet, in the tuple format, given by the canonical form of flt
+    '''
+    return decode_fleet(canonical_form(flt)[0], sorted((i[3] for i in flt), reverse=True))
+
+def canonical_hash(flt):
+    '''
+    returns a signed 64-bit hash of the canonical form of flt, shared by all the images of flt
+    '''
+    digest = hashlib.blake2b(canonical_form(flt)[0], digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+class DedupIndex(object):
+    '''
+    represents an on-disk set of canonical hashes, stored in an SQLite database at path, used to keep one
+    fleet per equivalence class across large corpora and separate runs. Distinct classes share a 64-bit
+    hash with negligible probability for corpora of up to hundreds of millions of fleets
+    '''
+    def __init__(self, path):
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS seen (hash INTEGER PRIMARY KEY)")
+
+    def add(self, flt):
+        '''
+        adds the equivalence class of flt to the index, and returns Boolean value indicating
+        whether it was new
+        '''
+        return self._db.execute("INSERT OR IGNORE INTO seen VALUES (?)", (canonical_hash(flt),)).rowcount == 1
+
+    def __contains__(self, flt):
+        '''
+        returns Boolean value indicating whether the equivalence class of flt is in the index
+        '''
+        return self._db.execute("SELECT 1 FROM seen WHERE hash = ?", (canonical_hash(flt),)).fetchone() is not None
+
+    def __len__(self):
+        '''
+        returns the number of equivalence classes in the index
+        '''
+        return self._db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def commit(self):
+        '''
+        writes the classes added so far to disk
+        '''
+        self._db.commit()
+
+    def close(self):
+        '''
+        commits and closes the index
+        '''
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def dedupe_corpus(source, target, index_path, commit_every=100000):
+    '''
+    copies to a new corpus file at target the fleets of the corpus file at source whose equivalence class
+    is not yet in the index at index_path, adding their classes to it. Returns the number of fleets kept
+    '''
+    kept = 0
+    with Corpus(source) as corpus, CorpusWriter(target, corpus.lengths()) as writer, DedupIndex(index_path) as index:
+        for i, flt in enumerate(corpus):
+            if index.add(flt):
+                writer.write(flt)
+                kept += 1
+            if not (i + 1) % commit_every:
+                index.commit()
+
+    return kept
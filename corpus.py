@@ -0,0 +1,176 @@
+import argparse, mmap, os, struct, sys
+from battleships import FLEET, generate_fleets, decode_fleet, encode_ship
+
+MAGIC = b"BSFC" # identifies a fleet corpus file
+VERSION = 2 # version 1 files had a 30-byte header
+# magic, version, ships per fleet, ship lengths (zero padded), number of fleets, and padding to 32 bytes so that
+# the records start on an 8-byte boundary
+HEADER = struct.Struct("<4sBB16sQ2x")
+
+class CorpusWriter(object):
+    '''
+    represents a fleet corpus file being written. Each fleet is stored as a fixed-width record of one
+    ship code (see encode_ship) per ship, the i-th ship having the i-th length of lengths
+    '''
+    def __init__(self, path, lengths=FLEET):
+        if len(lengths) > 16:
+            raise ValueError("a corpus fleet may have at most 16 ships")
+        self._lengths = tuple(lengths)
+        self._count = 0
+        self._file = open(path, "wb")
+        self._file.write(self._header())
+
+    def _header(self):
+        '''
+        returns the file header describing the records written so far
+        '''
+        return HEADER.pack(MAGIC, VERSION, len(self._lengths), bytes(self._lengths), self._count)
+
+    def write(self, flt):
+        '''
+        appends flt, given in the tuple format, to the corpus
+        '''
+        if tuple(i[3] for i in flt) != self._lengths:
+            raise ValueError("fleet does not match the ship lengths of the corpus")
+        self._file.write(bytes(encode_ship(*i[:3]) for i in flt))
+        self._count += 1
+
+    def write_records(self, records):
+        '''
+        appends the fleets of records, a bytes-like object of consecutive fixed-width records, to the corpus
+        '''
+        if len(records) % len(self._lengths):
+            raise ValueError("records are not a whole number of fleets")
+        self._file.write(records)
+        self._count += len(records) // len(self._lengths)
+
+    def close(self):
+        '''
+        records the number of fleets in the header and closes the file
+        '''
+        if not self._file.closed:
+            self._file.seek(0)
+            self._file.write(self._header())
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_corpus(path, n, seed=None, chunk_size=65536):
+    '''
+    streams n fleets, drawn as by randomly_place_all_ships and reproducible for a given seed, into a corpus
+    file at path without holding more than chunk_size of them in memory at once
+    '''
+    # checks n and chunk_size before the file is created
+    chunks = generate_fleets(n, seed, chunk_size)
+    with CorpusWriter(path) as writer:
+        for chunk in chunks:
+            writer.write_records(chunk)
+
+class Corpus(object):
+    '''
+    represents a fleet corpus file opened for reading. The file is memory-mapped, so fleets are decoded
+    on demand from any position and raw records are exposed without copying. Views returned by records
+    and array must be released before the Corpus is closed
+    '''
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            # an empty file cannot be mapped, and is no corpus either
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise ValueError(f"{path} is not a version {VERSION} fleet corpus")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, ships, lengths, count = HEADER.unpack_from(self._map)
+        # a truncated file, or one whose header was never completed, does not hold the fleets its header counts
+        if (magic != MAGIC or version != VERSION or not 1 <= ships <= 16
+                or len(self._map) != HEADER.size + count * ships):
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} fleet corpus")
+        self._lengths = tuple(lengths[:ships])
+        self._width = ships
+        self._count = count
+
+    def lengths(self):
+        '''
+        returns the ship lengths of the fleets in the corpus
+        '''
+        return self._lengths
+
+    def __len__(self):
+        '''
+        returns the number of fleets in the corpus
+        '''
+        return self._count
+
+    def __getitem__(self, i):
+        '''
+        returns the fleet of index i in the tuple format, or a list of fleets if i is a slice
+        '''
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("corpus index out of range")
+        offset = HEADER.size + i * self._width
+        return decode_fleet(self._map[offset:offset + self._width], self._lengths)
+
+    def __iter__(self):
+        '''
+        iterates over the fleets of the corpus in order
+        '''
+        return (self[i] for i in range(self._count))
+
+    def records(self, start=0, stop=None):
+        '''
+        returns a memoryview of the raw records of the fleets from index start up to stop, without copying
+        '''
+        start, stop, _ = slice(start, stop).indices(self._count)
+        view = memoryview(self._map)
+        return view[HEADER.size + start * self._width:HEADER.size + max(start, stop) * self._width]
+
+    def array(self):
+        '''
+        returns a read-only NumPy view of the corpus as an (N, ships) array of ship codes, without copying.
+        Requires NumPy
+        '''
+        import numpy as np
+        return np.frombuffer(self._map, dtype=np.uint8, count=self._count * self._width,
+                             offset=HEADER.size).reshape(self._count, self._width)
+
+    def close(self):
+        '''
+        unmaps the corpus file
+        '''
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main(argv=None):
+    '''
+    parses the command line to write a corpus of random fleets or to describe an existing corpus
+    '''
+    parser = argparse.ArgumentParser(description="Write or inspect a binary corpus of battleships fleets.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    write = commands.add_parser("write", help="write a corpus of random fleets")
+    write.add_argument("path")
+    write.add_argument("-n", "--fleets", type=int, default=1000000, help="number of fleets to write")
+    write.add_argument("-s", "--seed", type=int, default=None, help="seed for reproducible fleets")
+    info = commands.add_parser("info", help="describe a corpus")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "write":
+        write_corpus(args.path, args.fleets, args.seed)
+    with Corpus(args.path) as corpus:
+        print(f"{args.path}: {len(corpus)} fleets of {len(corpus.lengths())} ships {corpus.lengths()}")
+
+if __name__ == "__main__":
+    main()
+    sys.exit()
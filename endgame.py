@@ -0,0 +1,139 @@
+import time
+from collections import Counter
+from functools import lru_cache
+from battleships import FLEET, legal_slots, ship_mask, halo_mask, is_sunk
+from solver import DensitySolver
+
+class OutOfTime(Exception):
+    '''
+    raised when an exact count runs past its time budget
+    '''
+
+@lru_cache(maxsize=None)
+def _starts():
+    '''
+    returns a tuple holding, for each square, the (lth, mask, halo, cells) placements whose first square
+    (lowest row * 10 + col) it is, with each distinct footprint listed once
+    '''
+    starts = [{} for _ in range(100)]
+    for row, col, hor, lth in legal_slots():
+        mask = ship_mask(row, col, hor, lth)
+        cells = tuple(i for i in range(100) if mask >> i & 1)
+        starts[row * 10 + col][mask] = (lth, mask, halo_mask(row, col, hor, lth), cells)
+
+    return tuple(tuple(i.values()) for i in starts)
+
+class EndgameCounter(object):
+    '''
+    enumerates the arrangements of the remaining ships that are consistent with the shots fired so far.
+    Squares are decided in order: the lowest square that may still hold a ship is either left empty or
+    becomes the first square of one of the remaining ships, so each arrangement is reached exactly once.
+    Placing a ship removes its halo from the squares still free, which propagates the adjacency rule,
+    and the count of every (free, unsunk hits, remaining ships) subproblem is memoized
+    '''
+    def __init__(self, time_budget=None, memo_limit=500000):
+        self._memo = {}
+        self._memo_limit = memo_limit
+        self._time_budget = time_budget
+        self._deadline = None
+        self._calls = 0
+
+    def count(self, free, need, left):
+        '''
+        returns (total, occupancy) where total is the number of arrangements of the ships in left (a tuple
+        of the number of ships of each length, indexed by length - 1) on the squares of the mask free that
+        cover every square of the mask need, and occupancy maps each square to the number of those
+        arrangements that occupy it. Raises OutOfTime if the time budget runs out
+        '''
+        if len(self._memo) > self._memo_limit:
+            self._memo.clear()
+        self._deadline = self._time_budget and time.perf_counter() + self._time_budget
+        return self._count(free, need, left)
+
+    def _count(self, free, need, left):
+        '''
+        returns the memoized (total, occupancy) of a subproblem of count
+        '''
+        key = (free, need, left)
+        if key in self._memo:
+            return self._memo[key]
+
+        self._calls += 1
+        if self._deadline and not self._calls & 1023 and time.perf_counter() > self._deadline:
+            raise OutOfTime()
+
+        total, occupancy = 0, Counter()
+        if not any(left):
+            total = int(not need)
+        elif free.bit_count() >= sum(i * (n + 1) for n, i in enumerate(left)):
+            cell = (free & -free).bit_length() - 1 # the lowest square still free
+            if not need >> cell & 1:
+                total, occupancy = self._count(free & ~(1 << cell), need, left)
+                occupancy = occupancy.copy()
+            for lth, mask, halo, cells in _starts()[cell]:
+                # the ship must fit the free squares and must not touch a hit that it does not cover. Nor may it
+                # lie wholly on unsunk hits, as it would then have been reported sunk
+                if not left[lth - 1] or mask & ~free or need & halo & ~mask or not mask & ~need:
+                    continue
+                rest = left[:lth - 1] + (left[lth - 1] - 1,) + left[lth:]
+                n, occ = self._count(free & ~halo, need & ~mask, rest)
+                if n:
+                    total += n
+                    occupancy.update(occ)
+                    for i in cells:
+                        occupancy[i] += n
+
+        self._memo[key] = (total, occupancy)
+        return total, occupancy
+
+class EndgameSolver(DensitySolver):
+    '''
+    represents a DensitySolver that, once no more than max_ships ships are afloat, shoots at the square
+    with the highest exact hit probability over every arrangement of those ships consistent with the shots
+    fired so far. If an exact count runs past time_budget seconds, it falls back to the density map
+    '''
+    def __init__(self, rng=None, fleet=FLEET, max_ships=3, time_budget=0.05):
+        super().__init__(rng, fleet)
+        self._max_ships = max_ships
+        self._counter = EndgameCounter(time_budget)
+        self._blocked = 0 # squares known to be open sea: misses and the halos of sunk ships
+        self._need = 0 # hits on ships that are not yet sunk
+
+    def probabilities(self):
+        '''
+        returns a dictionary mapping each square still worth shooting at, as (row, col), to the exact
+        probability that it is occupied by a ship. Raises OutOfTime if the count runs past the time budget
+        '''
+        free = ((1 << 100) - 1) & ~self._blocked
+        total, occupancy = self._counter.count(free, self._need, tuple(self._afloat))
+        return {divmod(i, 10): occupancy[i] / total for i in self._open}
+
+    def next_shot(self):
+        '''
+        returns the row and col of the square most likely to hold a ship, computed exactly once few
+        enough ships are afloat, and from the density map otherwise
+        '''
+        if sum(self._afloat) > self._max_ships:
+            return super().next_shot()
+        try:
+            probabilities = self.probabilities()
+        except OutOfTime:
+            return super().next_shot()
+
+        best = max(probabilities.values())
+        cells = sorted(i for i, j in probabilities.items() if j == best)
+        return self._rng.choice(cells) if self._rng else cells[0]
+
+    def record(self, row, col, ship_hit):
+        '''
+        updates the density map and the known squares with the outcome of the shot at row and col.
+        ship_hit is the ship hit by the shot, or None if it missed
+        '''
+        super().record(row, col, ship_hit)
+        if ship_hit is None:
+            self._blocked |= 1 << (row * 10 + col)
+        elif is_sunk(ship_hit):
+            self._need &= ~ship_mask(*ship_hit[:4])
+            self._blocked |= halo_mask(*ship_hit[:4])
+        else:
+            self._need |= 1 << (row * 10 + col)
@@ -0,0 +1,185 @@
+import argparse, json, math, os, random, sys, time
+from concurrent.futures import ThreadPoolExecutor
+# SDL's dummy drivers need neither a screen nor a sound card. They must be chosen before pygame starts them
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame as pg
+import battleships_game
+from battleships_game import Game, SCREEN_WIDTH, SCREEN_HEIGHT, GRID_TOP_X, GRID_TOP_Y, CELL_SIZE
+
+TIMED = ("running", "game_logic", "update") # the Game methods whose every call is timed
+
+def percentile(samples, p):
+    '''
+    returns the p-th percentile of samples, by the nearest-rank method
+    '''
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+class Headless(object):
+    '''
+    represents a Game driven frame by frame without a display or sound card, on SDL's dummy drivers, as
+    main would drive it in polling mode. Every call of the methods in TIMED is timed. Fleets are drawn
+    from the random module, seeded with seed, and the fade lasts fade_duration milliseconds if given, until
+    close is called
+    '''
+    def __init__(self, seed=None, fade_duration=None):
+        self._fade_duration = battleships_game.FADE_DURATION # restored by close
+        if fade_duration is not None:
+            battleships_game.FADE_DURATION = fade_duration
+        pg.display.init()
+        pg.font.init()
+        pg.mixer.init()
+        self._clock = pg.time.Clock() # starts the timer the fade depends on
+        self._screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        random.seed(seed)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.game = Game(None, self._executor)
+        self.timings = {i: [] for i in TIMED} # duration, in seconds, of each call of each method timed
+        for name in TIMED:
+            setattr(self.game, name, self._timed(name, getattr(self.game, name)))
+        self._running = True
+
+    def _timed(self, name, method):
+        '''
+        returns method wrapped so that the duration of each call is added to the timings of name
+        '''
+        samples = self.timings[name]
+        def timed(*args):
+            start = time.perf_counter()
+            result = method(*args)
+            samples.append(time.perf_counter() - start)
+            return result
+        return timed
+
+    def frame(self, *events):
+        '''
+        queues events and runs one frame of the game. Returns Boolean value indicating whether the game
+        is still running
+        '''
+        for event in events:
+            pg.event.post(event)
+        if self._running:
+            self._running = self.game.running()
+            self.game.update(self._screen)
+        return self._running
+
+    def click(self, row, col):
+        '''
+        runs a frame in which the centre of the grid cell given by row and col is clicked
+        '''
+        pos = (GRID_TOP_X + col * CELL_SIZE + CELL_SIZE // 2, GRID_TOP_Y + row * CELL_SIZE + CELL_SIZE // 2)
+        return self.frame(pg.event.Event(pg.MOUSEBUTTONDOWN, button=1, pos=pos))
+
+    def key(self, char):
+        '''
+        runs a frame in which the key of the given character is pressed
+        '''
+        return self.frame(pg.event.Event(pg.KEYDOWN, unicode=char, key=ord(char)))
+
+    def idle(self, frames=1):
+        '''
+        runs the given number of frames without input
+        '''
+        for _ in range(frames):
+            self.frame()
+        return self._running
+
+    def fade(self):
+        '''
+        runs frames, at most FPS a second, until the game over screen has faded in
+        '''
+        while self._running and self.game.animating():
+            self.frame()
+            self._clock.tick(battleships_game.FPS)
+        return self._running
+
+    def quit(self):
+        '''
+        runs a frame in which the window is closed
+        '''
+        return self.frame(pg.event.Event(pg.QUIT))
+
+    def close(self):
+        '''
+        waits for any round being prepared, shuts pygame down and restores the duration of the fade
+        '''
+        self._executor.shutdown()
+        battleships_game.FADE_DURATION = self._fade_duration
+        battleships_game.clear_assets()
+        pg.quit()
+
+    def report(self):
+        '''
+        returns a dictionary mapping each method timed to its number of calls and its p50, p99 and
+        maximum durations in milliseconds
+        '''
+        return {name: {"calls": len(i), "p50": percentile(i, 50) * 1000, "p99": percentile(i, 99) * 1000,
+                       "max": max(i) * 1000} for name, i in self.timings.items() if i}
+
+def run_script(headless, lines):
+    '''
+    replays on headless the script given by lines, one step per line: "click ROW COL", "key CHAR",
+    "idle FRAMES", "fade" or "quit". Blank lines and text after a '#' are ignored. Stops early if the
+    game is closed
+    '''
+    steps = {
+        "click": lambda row, col: headless.click(int(row), int(col)),
+        "key": headless.key,
+        "idle": lambda frames="1": headless.idle(int(frames)),
+        "fade": headless.fade,
+        "quit": headless.quit
+    }
+    for number, line in enumerate(lines, 1):
+        words = line.split("#")[0].split()
+        if not words:
+            continue
+        if words[0] not in steps:
+            raise ValueError(f"line {number}: unknown step {words[0]!r}")
+        if not steps[words[0]](*words[1:]):
+            return
+
+def play_random(headless, games, rng):
+    '''
+    plays the given number of games on headless, clicking cells in a random order until the fleet sinks,
+    then letting the screen fade and pressing 'Y' for the next game
+    '''
+    for _ in range(games):
+        cells = [(r, c) for r in range(10) for c in range(10)]
+        rng.shuffle(cells)
+        while not headless.game.over():
+            headless.click(*cells.pop())
+        headless.fade()
+        headless.key("y")
+
+def main(argv=None):
+    '''
+    parses the command line, replays a script or random games without a display and prints the frame timings
+    '''
+    parser = argparse.ArgumentParser(description="Replay battleships games headlessly and time their frames.")
+    parser.add_argument("script", nargs="?", help="script of steps to replay (default: random games)")
+    parser.add_argument("-g", "--games", type=int, default=10, help="number of random games to play without a script")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed for the fleets and the random games")
+    parser.add_argument("--fade-ms", type=int, default=None, help="duration of the fade to black in milliseconds")
+    parser.add_argument("--json", action="store_true", help="print the timings as JSON")
+    args = parser.parse_args(argv)
+
+    headless = Headless(args.seed, args.fade_ms)
+    if args.script:
+        with open(args.script) as f:
+            run_script(headless, f)
+    else:
+        play_random(headless, args.games, random.Random(args.seed))
+    headless.close()
+
+    report = headless.report()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, i in report.items():
+            print(f"{name}: {i['calls']} calls, p50 {i['p50']:.3f} ms, p99 {i['p99']:.3f} ms, max {i['max']:.3f} ms")
+
+if __name__ == "__main__":
+    main()
+    sys.exit()
@@ -0,0 +1,167 @@
+import atexit, json, os, sys, threading, time
+from collections import Counter, deque
+
+# instrumentation is off unless switched on with enable, or with the environment variable BATTLESHIPS_INSTRUMENT:
+# "1" switches it on, and a path also dumps a snapshot there every BATTLESHIPS_INSTRUMENT_INTERVAL seconds,
+# as JSON lines if the path ends in .json and as text otherwise. Call sites check enabled before recording
+# anything, so that instrumentation costs a single attribute lookup while it is off
+enabled = False
+SAMPLES = 1000 # number of most recent durations kept for each timing, from which percentiles are taken
+
+_counters = Counter()
+_maxima = {}
+_timings = {}
+
+class _Timing(object):
+    '''
+    represents the durations observed under one name: their count, total and maximum, and the most recent ones
+    '''
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=SAMPLES)
+
+    def add(self, seconds):
+        '''
+        records a duration in seconds
+        '''
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self):
+        '''
+        returns a dictionary of the count of the durations, and of their mean, maximum, and recent p50 and p99,
+        in milliseconds
+        '''
+        recent = sorted(self.recent)
+        return {"count": self.count, "mean_ms": self.total / self.count * 1000, "max_ms": self.max * 1000,
+                "p50_ms": recent[(len(recent) - 1) // 2] * 1000, "p99_ms": recent[(len(recent) * 99 - 1) // 100] * 1000}
+
+def enable():
+    '''
+    switches instrumentation on
+    '''
+    global enabled
+    enabled = True
+
+def disable():
+    '''
+    switches instrumentation off. What has been recorded is kept
+    '''
+    global enabled
+    enabled = False
+
+def count(name, n=1):
+    '''
+    adds n to the counter of the given name
+    '''
+    _counters[name] += n
+
+def maximum(name, value):
+    '''
+    records value under the given name if it is the largest recorded there so far
+    '''
+    if value > _maxima.get(name, value - 1):
+        _maxima[name] = value
+
+def observe(name, seconds):
+    '''
+    records a duration, in seconds, under the given name
+    '''
+    timing = _timings.get(name)
+    if timing is None:
+        timing = _timings[name] = _Timing()
+    timing.add(seconds)
+
+def snapshot():
+    '''
+    returns a dictionary of everything recorded so far: the counters, the maxima and a summary of each timing
+    '''
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "counters": dict(sorted(_counters.items())),
+        "maxima": dict(sorted(_maxima.items())),
+        "timings": {i: j.summary() for i, j in sorted(_timings.items())}
+    }
+
+def reset():
+    '''
+    forgets everything recorded so far
+    '''
+    _counters.clear()
+    _maxima.clear()
+    _timings.clear()
+
+def format_text(snap):
+    '''
+    returns a snapshot, as returned by snapshot, as lines of text
+    '''
+    lines = [f"[{snap['time']}]"]
+    lines += [f"{i}: {j}" for i, j in snap["counters"].items()]
+    lines += [f"{i} (max): {j}" for i, j in snap["maxima"].items()]
+    lines += [f"{i}: {j['count']} times, mean {j['mean_ms']:.3f} ms, p50 {j['p50_ms']:.3f} ms, "
+              f"p99 {j['p99_ms']:.3f} ms, max {j['max_ms']:.3f} ms" for i, j in snap["timings"].items()]
+    return "\n".join(lines) + "\n"
+
+def dump(stream=sys.stderr, fmt="text"):
+    '''
+    writes a snapshot to stream, as text or, if fmt is "json", as one JSON line
+    '''
+    snap = snapshot()
+    stream.write(json.dumps(snap) + "\n" if fmt == "json" else format_text(snap))
+    stream.flush()
+
+class Dumper(object):
+    '''
+    represents a background thread that appends a snapshot to the file at path every interval seconds, as
+    JSON lines if fmt is "json" and as text otherwise, and a last one when stopped
+    '''
+    def __init__(self, path, interval=10.0, fmt="text"):
+        self._path = path
+        self._fmt = fmt
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        '''
+        dumps a snapshot every interval seconds until stopped, then a last one
+        '''
+        while not self._stop.wait(self._interval):
+            self._dump()
+        self._dump()
+
+    def _dump(self):
+        '''
+        appends a snapshot to the file
+        '''
+        with open(self._path, "a") as f:
+            dump(f, self._fmt)
+
+    def stop(self):
+        '''
+        stops dumping, once the last snapshot is written
+        '''
+        self._stop.set()
+        self._thread.join()
+
+def _from_environment():
+    '''
+    switches instrumentation on, and starts dumping, as asked by the environment. Returns the Dumper started, if any
+    '''
+    setting = os.environ.get("BATTLESHIPS_INSTRUMENT", "")
+    if setting in ("", "0"):
+        return None
+    enable()
+    if setting == "1":
+        return None
+    interval = float(os.environ.get("BATTLESHIPS_INSTRUMENT_INTERVAL", 10))
+    dumper = Dumper(setting, interval, "json" if setting.endswith(".json") else "text")
+    atexit.register(dumper.stop) # writes the last snapshot on the way out
+    return dumper
+
+dumper = _from_environment()
@@ -0,0 +1,100 @@
+import numpy as np
+from battleships import FLEET, generate_fleets, encode_ship
+
+class Lockstep(object):
+    '''
+    represents a batch of games played in lockstep, each against its own fleet. The fleets are kept as an
+    (N, 10, 10) grid holding the index of the ship occupying each square (-1 for open sea), together with
+    the number of unhit squares left on each ship, so that one shot per game is resolved for the whole
+    batch by a handful of array operations
+    '''
+    def __init__(self, codes, lengths=FLEET):
+        # codes holds one row of ship codes (see encode_ship) per game, the i-th ship having the i-th length of lengths
+        codes = np.asarray(codes, dtype=np.uint8).reshape(-1, len(lengths))
+        n = len(codes)
+        self._games = np.arange(n)
+        self._grid = np.full((n, 10, 10), -1, dtype=np.int8)
+        hor, row, col = codes & 1, (codes >> 1) // 10, (codes >> 1) % 10
+        for k, lth in enumerate(lengths):
+            for i in range(lth):
+                self._grid[self._games, row[:, k] + i * (1 - hor[:, k]), col[:, k] + i * hor[:, k]] = k
+        self._left = np.tile(np.array(lengths, dtype=np.int8), (n, 1)) # unhit squares of each ship
+        self._afloat = np.full(n, len(lengths), dtype=np.int16) # unsunk ships of each game
+        self._fired = np.zeros((n, 10, 10), dtype=bool) # squares each game has already shot at
+        self._shots = np.zeros(n, dtype=np.int32)
+
+    @classmethod
+    def from_fleets(cls, fleets):
+        '''
+        returns a Lockstep playing one game against each fleet of fleets, given in the tuple format
+        of randomly_place_all_ships
+        '''
+        return cls([[encode_ship(*i[:3]) for i in flt] for flt in fleets], [i[3] for i in fleets[0]])
+
+    @classmethod
+    def random(cls, n, seed=None):
+        '''
+        returns a Lockstep playing n games against fleets drawn by generate_fleets
+        '''
+        return cls(np.frombuffer(b"".join(generate_fleets(n, seed)), dtype=np.uint8))
+
+    def __len__(self):
+        '''
+        returns the number of games in the batch
+        '''
+        return len(self._games)
+
+    def shoot(self, rows, cols):
+        '''
+        fires one shot in every game that is not over, at the square given by the matching elements of rows
+        and cols (arrays of length N, or scalars to fire at the same square in every game). Returns three
+        Boolean arrays of length N: whether the shot hit a ship that had not been hit there before, whether
+        it sank a ship, and whether it ended the game
+        '''
+        rows = np.broadcast_to(rows, self._games.shape)
+        cols = np.broadcast_to(cols, self._games.shape)
+        live = self._afloat > 0
+        ship = self._grid[self._games, rows, cols]
+        hit = live & (ship >= 0) & ~self._fired[self._games, rows, cols]
+        self._fired[self._games, rows, cols] |= live
+        self._shots += live
+
+        games, ships = self._games[hit], ship[hit]
+        self._left[games, ships] -= 1
+        sunk = np.zeros_like(hit)
+        sunk[games] = self._left[games, ships] == 0
+        self._afloat -= sunk
+        return hit, sunk, sunk & (self._afloat == 0)
+
+    def over(self):
+        '''
+        returns a Boolean array indicating which games have had their whole fleet sunk
+        '''
+        return self._afloat == 0
+
+    def afloat(self):
+        '''
+        returns an array of the number of unsunk ships in each game
+        '''
+        return self._afloat.copy()
+
+    def shots(self):
+        '''
+        returns an array of the number of shots fired in each game while it was not over
+        '''
+        return self._shots.copy()
+
+def play_random(n, seed=None):
+    '''
+    plays n games in lockstep, each shooting at every square once in its own random order, and returns
+    an array of the number of shots each game required
+    '''
+    rng = np.random.default_rng(seed)
+    games = Lockstep.random(n, seed)
+    order = rng.permuted(np.tile(np.arange(100), (n, 1)), axis=1)
+    for i in range(100):
+        games.shoot(order[:, i] // 10, order[:, i] % 10)
+        if games.over().all():
+            break
+
+    return games.shots()
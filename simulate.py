@@ -0,0 +1,189 @@
+import argparse, hashlib, random, sys
+from collections import Counter
+from multiprocessing import Pool, cpu_count
+from battleships import (ROWS, COLS, Fleet, randomly_place_all_ships, generate_fleets, check_if_hits, hit,
+                         are_unsunk_ships_left)
+from corpus import CorpusWriter
+from solver import DensitySolver
+from endgame import EndgameSolver
+
+class RandomPlayer(object):
+    '''
+    represents a player who shoots at every cell of the ocean once, in a random order
+    '''
+    def __init__(self, rng):
+        self._shots = [(r, c) for r in range(10) for c in range(10)]
+        rng.shuffle(self._shots)
+
+    def next_shot(self):
+        '''
+        returns the row and col of the next shot
+        '''
+        return self._shots.pop()
+
+    def record(self, row, col, ship_hit):
+        '''
+        informs the player of the outcome of the shot at row and col. ship_hit is the ship hit
+        by the shot, or None if it missed
+        '''
+
+STRATEGIES = {
+    "random": RandomPlayer,
+    "density": DensitySolver,
+    "endgame": EndgameSolver
+}
+
+class Summary(object):
+    '''
+    represents the merged results of a number of simulated games
+    '''
+    def __init__(self):
+        self._shots = Counter() # maps the number of shots a game required to the number of games that required it
+
+    def add(self, shots):
+        '''
+        records a game that required the given number of shots
+        '''
+        self._shots[shots] += 1
+
+    def merge(self, other):
+        '''
+        adds the games recorded by other Summary to those of this one, and returns this Summary
+        '''
+        self._shots.update(other._shots)
+        return self
+
+    def games(self):
+        '''
+        returns the number of games recorded
+        '''
+        return sum(self._shots.values())
+
+    def mean(self):
+        '''
+        returns the mean number of shots per game
+        '''
+        return sum(i * j for i, j in self._shots.items()) / self.games()
+
+    def histogram(self):
+        '''
+        returns a dictionary mapping each number of shots to the number of games that required it
+        '''
+        return dict(sorted(self._shots.items()))
+
+    def __str__(self):
+        '''
+        returns a short report of the games recorded
+        '''
+        if not self._shots:
+            return "No games played."
+        return (f"{self.games()} games, shots per game: mean {self.mean():.2f}, "
+                f"min {min(self._shots)}, max {max(self._shots)}")
+
+def task_seed(seed, index):
+    '''
+    returns the seed of the task of the given index, derived from seed by hashing, so that tasks draw
+    independent random streams that are reproducible whichever worker runs them
+    '''
+    digest = hashlib.sha256(f"{seed}:{index}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+def play(flt, player, rows=ROWS, cols=COLS):
+    '''
+    plays out a game against flt, in an ocean of the given dimensions, with shots chosen by player, 
+    and returns the number of shots required
+    '''
+    shots = 0
+    while are_unsunk_ships_left(flt):
+        row, col = player.next_shot()
+        shots += 1
+        ship_hit = hit(row, col, flt, rows, cols)[1] if check_if_hits(row, col, flt, rows, cols) else None
+        player.record(row, col, ship_hit)
+
+    return shots
+
+def simulate(games, seed=None, strategy="random"):
+    '''
+    plays the given number of games, each against a freshly generated fleet, and returns their Summary
+    '''
+    rng = random.Random(seed)
+    player = STRATEGIES[strategy]
+    summary = Summary()
+    for _ in range(games):
+        summary.add(play(Fleet(randomly_place_all_ships(rng)), player(rng)))
+
+    return summary
+
+def _simulate_task(args):
+    '''
+    runs one task of a parallel simulation in a worker process
+    '''
+    games, seed, index, strategy = args
+    return simulate(games, task_seed(seed, index), strategy)
+
+def run(games, workers=None, seed=0, strategy="random", task_size=1000):
+    '''
+    plays the given number of games across a pool of worker processes and returns their merged Summary.
+    The games are split into tasks of task_size games, each seeded from seed and its index, so the
+    results depend only on seed and not on the number of workers
+    '''
+    tasks = [(min(task_size, games - i), seed, i // task_size, strategy) for i in range(0, games, task_size)]
+    summary = Summary()
+    with Pool(workers or cpu_count()) as pool:
+        for i in pool.imap_unordered(_simulate_task, tasks):
+            summary.merge(i)
+
+    return summary
+
+def _generate_task(args):
+    '''
+    generates the fleets of one task of a parallel generation in a worker process
+    '''
+    fleets, seed, index = args
+    return b"".join(generate_fleets(fleets, task_seed(seed, index)))
+
+def generate(fleets, workers=None, seed=0, task_size=65536):
+    '''
+    lazily generates the given number of fleets across a pool of worker processes, yielding them in order as 
+    chunks of up to task_size fleets in the format of generate_fleets. Each chunk is seeded from seed and its 
+    index, so the fleets depend only on seed and task_size and not on the number of workers. Raises ValueError, 
+    when called rather than once iterated, if task_size is not positive
+    '''
+    if task_size < 1:
+        raise ValueError(f"the task size must be positive, not {task_size}")
+    return _generate(fleets, workers, seed, task_size)
+
+def _generate(fleets, workers, seed, task_size):
+    '''
+    yields, in order, the chunks of fleets described in generate as the pool of worker processes draws them
+    '''
+    tasks = [(min(task_size, fleets - i), seed, i // task_size) for i in range(0, fleets, task_size)]
+    with Pool(workers or cpu_count()) as pool:
+        yield from pool.imap(_generate_task, tasks)
+
+def main(argv=None):
+    '''
+    parses the command line and runs a parallel simulation, printing its summary, or with --fleets, 
+    generates fleets in parallel into a corpus file instead of playing games
+    '''
+    parser = argparse.ArgumentParser(description="Simulate games of battleships across all cores.")
+    parser.add_argument("-n", "--games", type=int, default=10000, help="number of games to play")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed from which every task's seed is derived")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="random", help="how shots are chosen")
+    parser.add_argument("--task-size", type=int, default=1000, help="number of games (or fleets) per task")
+    parser.add_argument("--fleets", metavar="PATH", default=None,
+                        help="write --games random fleets to a corpus at PATH instead of playing")
+    args = parser.parse_args(argv)
+    if args.fleets:
+        chunks = generate(args.games, args.workers, args.seed, args.task_size)
+        with CorpusWriter(args.fleets) as writer:
+            for chunk in chunks:
+                writer.write_records(chunk)
+        print(f"{args.fleets}: {args.games} fleets")
+        return
+    print(run(args.games, args.workers, args.seed, args.strategy, args.task_size))
+
+if __name__ == "__main__":
+    main()
+    sys.exit()
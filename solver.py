@@ -0,0 +1,123 @@
+from functools import lru_cache
+from battleships import FLEET, legal_slots, coords, halo_mask, is_sunk
+
+TARGET_WEIGHT = 1 << 20 # weight of a cell that extends an unsunk hit, which always beats any hunting score
+
+@lru_cache(maxsize=None)
+def _tables():
+    '''
+    returns the placements the solver reasons about: a tuple of (lth, cells) pairs, one per distinct ship
+    footprint, where cells are square indices (row * 10 + col), together with, for each square, the
+    placements covering it and the placements that merely touch it
+    '''
+    placements = []
+    covering = [[] for _ in range(100)]
+    touching = [[] for _ in range(100)]
+    seen = set()
+    for row, col, hor, lth in legal_slots():
+        cells = tuple(sorted(r * 10 + c for r, c in coords(row, col, hor, lth)))
+        if cells in seen: # a submarine has the same footprint in both orientations
+            continue
+        seen.add(cells)
+        halo = halo_mask(row, col, hor, lth)
+        for j in range(100):
+            if j in cells:
+                covering[j].append(len(placements))
+            elif halo >> j & 1:
+                touching[j].append(len(placements))
+        placements.append((lth, cells))
+
+    return tuple(placements), tuple(map(tuple, covering)), tuple(map(tuple, touching))
+
+class DensitySolver(object):
+    '''
+    represents an automated player that shoots at the square that the most placements of the unsunk ships
+    could still occupy, given the misses, hits and sunk ships seen so far. While a ship is hit but not sunk,
+    it shoots at the square covered by the most placements through the unsunk hits instead. The density map
+    is updated incrementally: each shot only retires the placements it rules out
+    '''
+    def __init__(self, rng=None, fleet=FLEET):
+        self._rng = rng
+        self._placements, self._covering, self._touching = _tables()
+        self._valid = [True] * len(self._placements)
+        self._hits = [0] * len(self._placements) # number of unsunk hits each placement covers
+        self._afloat = [fleet.count(i) for i in range(1, 5)] # unsunk ships of each length, indexed by length - 1
+        # number of valid placements of each length covering each square, indexed by length - 1
+        self._density = [[0] * 100 for _ in range(4)]
+        # unsunk hits covered by the valid placements of each length through each square, summed
+        self._target = [[0] * 100 for _ in range(4)]
+        self._open = set(range(100)) # squares not yet shot at and not known to be open sea
+        for lth, cells in self._placements:
+            for i in cells:
+                self._density[lth - 1][i] += 1
+
+    def scores(self):
+        '''
+        returns a dictionary mapping each square still worth shooting at, as (row, col), to its score
+        '''
+        return {divmod(i, 10): self._score(i) for i in self._open}
+
+    def _score(self, i):
+        '''
+        returns the score of the square of index i
+        '''
+        return sum(n * (TARGET_WEIGHT * t[i] + d[i]) for n, t, d in zip(self._afloat, self._target, self._density))
+
+    def next_shot(self):
+        '''
+        returns the row and col of the square with the highest score. Ties are broken at random
+        if the solver was given a random source, and by the lowest square otherwise
+        '''
+        scores = {i: self._score(i) for i in self._open}
+        best = max(scores.values())
+        cells = sorted(i for i, j in scores.items() if j == best)
+        return divmod(self._rng.choice(cells) if self._rng else cells[0], 10)
+
+    def record(self, row, col, ship_hit):
+        '''
+        updates the density map with the outcome of the shot at row and col. ship_hit is the ship hit
+        by the shot, or None if it missed
+        '''
+        cell = row * 10 + col
+        self._open.discard(cell)
+        if ship_hit is None:
+            for i in self._covering[cell]:
+                self._retire(i)
+            return
+
+        # no other ship may touch the ship that was hit, and every placement through the hit gains a hit
+        for i in self._touching[cell]:
+            self._retire(i)
+        for i in self._covering[cell]:
+            if self._valid[i]:
+                self._hits[i] += 1
+                lth, cells = self._placements[i]
+                for j in cells:
+                    self._target[lth - 1][j] += 1
+
+        if is_sunk(ship_hit):
+            self._sink(ship_hit)
+
+    def _sink(self, ship):
+        '''
+        removes the sunk ship from the fleet still afloat, and rules out every placement meeting its halo
+        '''
+        self._afloat[ship[3] - 1] -= 1
+        halo = halo_mask(*ship[:4])
+        for cell in range(100):
+            if halo >> cell & 1:
+                self._open.discard(cell) # the squares around a sunk ship are known to be open sea
+                for i in self._covering[cell]:
+                    self._retire(i)
+
+    def _retire(self, i):
+        '''
+        marks the placement of index i as no longer possible and removes it from the density map
+        '''
+        if not self._valid[i]:
+            return
+        self._valid[i] = False
+        lth, cells = self._placements[i]
+        for j in cells:
+            self._density[lth - 1][j] -= 1
+            self._target[lth - 1][j] -= self._hits[i]
@@ -0,0 +1,106 @@
+import pytest
+from random import Random
+from array import array
+from collections import Counter
+from arrangements import *
+from arrangements import _randrange
+from battleships import coords, ok_to_place_ship_at
+
+def brute_force(rows, cols, fleet):
+    '''
+    returns the set of distinct legal arrangements of fleet, found by trying every placement of every ship
+    '''
+    def cells(r, c, h, l):
+        return frozenset((r + i * (not h), c + i * h) for i in range(l))
+
+    slots = {l: {cells(r, c, h, l) for r in range(rows) for c in range(cols) for h in (False, True)
+                 if all(0 <= i < rows and 0 <= j < cols for i, j in cells(r, c, h, l))} for l in set(fleet)}
+    found = set()
+    def place(i, occupied, halo):
+        if i == len(fleet):
+            found.add(occupied)
+            return
+        for s in slots[fleet[i]]:
+            if not s & halo:
+                place(i + 1, occupied | s, halo | {(r + x, c + y) for r, c in s for x in (-1, 0, 1) for y in (-1, 0, 1)})
+
+    place(0, frozenset(), frozenset())
+    return found
+
+
+'''
+count
+'''
+@pytest.mark.parametrize("rows, cols, fleet", [
+    (3, 3, (2, 1)),
+    (4, 4, (2, 1, 1)),
+    (5, 4, (3, 2, 1)),
+    (5, 5, (3, 2, 2, 1, 1)),
+    (6, 5, (4, 2, 1, 1)),
+    # checks that a fleet that cannot fit has no arrangements
+    (2, 2, (1, 1))
+])
+
+def test_count(rows, cols, fleet):
+    assert ArrangementCounter(rows, cols, fleet, cache_dir=None).count() == len(brute_force(rows, cols, fleet))
+
+
+'''
+sample
+'''
+def test_sample_is_uniform():
+    counter = ArrangementCounter(3, 3, (2, 1), cache_dir=None)
+    rng = Random(0)
+    draws = Counter(frozenset(j for i in counter.sample(rng) for j in coords(*i[:4])) for _ in range(4000))
+    # checks that every arrangement is drawn, and none much more often than the others
+    assert len(draws) == counter.count()
+    assert max(draws.values()) < 1.5 * min(draws.values())
+
+@pytest.mark.parametrize("seed", range(10))
+
+def test_sample_is_legal(seed):
+    flt = ArrangementCounter(6, 6, (3, 2, 2, 1), cache_dir=None).sample(Random(seed))
+    assert [i[3] for i in flt] == [3, 2, 2, 1]
+    assert all(ok_to_place_ship_at(*flt[i][:4], flt[:i]) for i in range(len(flt)))
+
+def test_sample_with_numpy():
+    np = pytest.importorskip("numpy")
+    counter = ArrangementCounter(6, 6, (3, 2, 2, 1), cache_dir=None)
+    flt = counter.sample(np.random.default_rng(2))
+    assert all(ok_to_place_ship_at(*flt[i][:4], flt[:i]) for i in range(len(flt)))
+    assert flt == counter.sample(np.random.default_rng(2))
+    # checks draws from ranges beyond 64 bits, which the Generator cannot draw in one call
+    rng = np.random.default_rng(0)
+    draws = [_randrange(rng, 3 * 2 ** 70) for _ in range(200)]
+    assert all(0 <= i < 3 * 2 ** 70 for i in draws) and max(draws) >= 2 ** 71
+
+def test_table_is_cached_on_disk(tmp_path):
+    first = ArrangementCounter(5, 5, (3, 2, 2, 1, 1), cache_dir=str(tmp_path))
+    total = first.count()
+    assert len(list(tmp_path.iterdir())) == 1
+    # checks that a second counter reads the stored table instead of counting again, and can sample from it
+    second = ArrangementCounter(5, 5, (3, 2, 2, 1, 1), cache_dir=str(tmp_path))
+    assert second._keys is not None
+    assert second.count() == total
+    assert second.sample(Random(1)) == first.sample(Random(1))
+
+@pytest.mark.parametrize("damage", [
+    # a table written before the header was added: the number of entries, then the keys and counts
+    lambda data: array("q", [(len(data) - HEADER.size - 6) // 16]).tobytes() + data[HEADER.size + 6:],
+    # a table written by another version, on a machine of the other byte order, or for another fleet
+    lambda data: data[:4] + bytes([VERSION + 1]) + data[5:],
+    lambda data: data[:5] + (b"b" if data[5:6] == b"l" else b"l") + data[6:],
+    lambda data: data[:HEADER.size] + bytes([3]) + data[HEADER.size + 1:],
+    # a truncated table
+    lambda data: data[:-8]
+])
+
+def test_stored_table_is_checked(tmp_path, damage):
+    total = ArrangementCounter(5, 5, (3, 2, 2, 1, 1), cache_dir=str(tmp_path)).count()
+    path = next(tmp_path.iterdir())
+    path.write_bytes(damage(path.read_bytes()))
+    # checks that a table that does not match is counted again, and stored again
+    counter = ArrangementCounter(5, 5, (3, 2, 2, 1, 1), cache_dir=str(tmp_path))
+    assert counter._keys is None
+    assert counter.count() == total
+    assert ArrangementCounter(5, 5, (3, 2, 2, 1, 1), cache_dir=str(tmp_path))._keys is not None
@@ -1,4 +1,4 @@
-import pytest
+import pytest, copy, random
 from battleships import *
 from random import randint as ri
 
@@ -67,6 +67,51 @@ def test_coords(test_input, expected):
     assert coords(*test_input) == expected
 
 
+
+'''
+ship_mask
+'''
+@pytest.mark.parametrize("test_input, expected", [
+    ((0, 0, True, 1), 1),
+    ((0, 0, True, 4), 0b1111),
+    ((0, 0, False, 3), 1 | 1 << 10 | 1 << 20),
+    ((9, 9, False, 1), 1 << 99),
+    # checks that squares falling outside the ocean are dropped from the mask
+    ((9, 8, True, 3), 1 << 98 | 1 << 99),
+    ((8, 9, True, 2), 1 << 89)
+])
+
+def test_ship_mask(test_input, expected):
+    assert ship_mask(*test_input) == expected
+
+
+'''
+halo_mask
+'''
+@pytest.mark.parametrize("test_input, expected", [
+    # checks that the halo of a ship in a corner is clipped to the ocean
+    ((0, 0, True, 1), {(0, 0), (0, 1), (1, 0), (1, 1)}),
+    ((9, 8, True, 2), {(8, 7), (8, 8), (8, 9), (9, 7), (9, 8), (9, 9)}),
+    ((4, 4, False, 2), {(r, c) for r in range(3, 7) for c in range(3, 6)})
+])
+
+def test_halo_mask(test_input, expected):
+    assert halo_mask(*test_input) == sum(1 << (r * 10 + c) for r, c in expected)
+
+
+'''
+fleet_mask
+'''
+@pytest.mark.parametrize("test_input, expected", [
+    ([], 0),
+    ([(0, 0, True, 4, set())], 0b1111),
+    # checks that hits do not affect the occupancy mask
+    ([(0, 0, True, 2, {(0, 0)}), (9, 9, True, 1, set())], 0b11 | 1 << 99)
+])
+
+def test_fleet_mask(test_input, expected):
+    assert fleet_mask(test_input) == expected
+
 '''
 is_open_sea
 '''
@@ -397,9 +442,12 @@ check_if_hits
 
     
 ])
+# checks that a Fleet, with its square index, resolves shots exactly as a plain list of ships does
+@pytest.mark.parametrize("wrap", [list, Fleet])
 
-def test_check_if_hits(test_input, expected):
-    assert check_if_hits(*test_input) == expected
+def test_check_if_hits(test_input, expected, wrap):
+    row, col, flt = copy.deepcopy(test_input)
+    assert check_if_hits(row, col, wrap(flt)) == expected
 
 
 '''
@@ -527,9 +575,11 @@ hit
         (7, 9, True, 1, {(7, 9)})
     ], (7, 9, True, 1, {(7, 9)})))
 ])
+@pytest.mark.parametrize("wrap", [list, Fleet])
 
-def test_hit(test_input, expected):
-    assert hit(*test_input) == expected
+def test_hit(test_input, expected, wrap):
+    row, col, flt = copy.deepcopy(test_input)
+    assert hit(row, col, wrap(flt)) == expected
 
 
 '''
@@ -602,6 +652,313 @@ are_unsunk_ships_left
         (9, 3, True, 1, {(9, 3)})
     ]), False),
 ])
+@pytest.mark.parametrize("wrap", [list, Fleet])
+
+def test_are_unsunk_ships_left(test_input, expected, wrap):
+    assert are_unsunk_ships_left(wrap(copy.deepcopy(test_input))) == expected
+
+
+'''
+legal_slots
+'''
+def test_legal_slots():
+    slots = legal_slots()
+    # checks that each length has one slot per orientation and legal starting square
+    assert len(slots) == 200 + 180 + 160 + 140
+    assert all(ok_to_place_ship_at(*i, []) for i in slots)
+
+
+'''
+randomly_place_all_ships
+'''
+@pytest.mark.parametrize("attempt", range(20))
+
+def test_randomly_place_all_ships(attempt):
+    flt = randomly_place_all_ships()
+    assert [i[3] for i in flt] == list(FLEET)
+    # checks that each ship was legal with respect to the ships placed before it
+    assert all(ok_to_place_ship_at(*flt[i][:4], flt[:i]) for i in range(len(flt)))
+    assert all(i[4] == set() for i in flt)
+
+def test_seeded_placement():
+    # checks that a generator, wrapped or not, reproduces the same fleets for the same seed
+    blocks = RandomBlocks(random.Random(5))
+    fleets = [randomly_place_all_ships(blocks) for _ in range(10)]
+    blocks = RandomBlocks(random.Random(5))
+    assert fleets == [randomly_place_all_ships(blocks) for _ in range(10)]
+    assert randomly_place_all_ships(random.Random(5)) == randomly_place_all_ships(random.Random(5))
+
+def test_numpy_placement():
+    np = pytest.importorskip("numpy")
+    for rows, cols, fleet in [(10, 10, FLEET), (40, 40, FLEET * 5)]:
+        flt = randomly_place_all_ships(np.random.default_rng(3), fleet, rows, cols)
+        assert [i[3] for i in flt] == list(fleet)
+        assert all(ok_to_place_ship_at(*flt[i][:4], flt[:i], rows, cols) for i in range(len(flt)))
+        assert flt == randomly_place_all_ships(np.random.default_rng(3), fleet, rows, cols)
+
+def test_random_blocks():
+    blocks = RandomBlocks(random.Random(0), block=7)
+    draws = [blocks.randrange(3) for _ in range(300)]
+    assert set(draws) == {0, 1, 2}
+    assert all(0 <= blocks.random() < 1 for _ in range(20))
+    # checks that ranges too wide to be drawn from a float without bias are refused
+    with pytest.raises(ValueError):
+        blocks.randrange(RANDRANGE_LIMIT + 1)
+
+
+'''
+encode_ship and decode_fleet
+'''
+@pytest.mark.parametrize("test_input, expected", [
+    ((0, 0, False), 0),
+    ((0, 0, True), 1),
+    ((4, 7, False), 94),
+    ((9, 9, True), 199)
+])
+
+def test_encode_ship(test_input, expected):
+    assert encode_ship(*test_input) == expected
+
+def test_decode_fleet():
+    flt = randomly_place_all_ships()
+    assert decode_fleet(bytes(encode_ship(*i[:3]) for i in flt)) == flt
+
+
+'''
+generate_fleets
+'''
+@pytest.mark.parametrize("n, chunk_size, expected", [
+    (10, 4, [4, 4, 2]),
+    (8, 4, [4, 4]),
+    (3, 100, [3]),
+    (0, 4, [])
+])
+
+def test_generate_fleets_chunks(n, chunk_size, expected):
+    assert [len(i) // len(FLEET) for i in generate_fleets(n, seed=0, chunk_size=chunk_size)] == expected
+
+def test_generate_fleets():
+    chunk = b"".join(generate_fleets(50, seed=1, chunk_size=16))
+    # checks that the same seed reproduces the same fleets, whatever the chunk size
+    assert chunk == b"".join(generate_fleets(50, seed=1))
+    for i in range(0, len(chunk), len(FLEET)):
+        flt = decode_fleet(chunk[i:i + len(FLEET)])
+        assert all(ok_to_place_ship_at(*flt[j][:4], flt[:j]) for j in range(len(flt)))
+
+@pytest.mark.parametrize("n, chunk_size", [(3, 0), (3, -1), (-1, 4)])
+
+def test_generate_fleets_invalid(n, chunk_size):
+    with pytest.raises(ValueError):
+        generate_fleets(n, seed=0, chunk_size=chunk_size)
+
+def test_generate_fleets_rng():
+    assert b"".join(generate_fleets(20, rng=random.Random(7))) == b"".join(generate_fleets(20, seed=7))
+
+
+'''
+Fleet
+'''
+def test_fleet_counts_hits_once():
+    flt = Fleet([(0, 0, True, 2, set()), (5, 5, True, 1, set())])
+    assert flt.hit(0, 0) == flt[0]
+    # checks that repeating a shot neither adds a hit nor brings the end of the game closer
+    assert flt.hit(0, 0) == flt[0]
+    assert flt.hit(3, 3) is None
+    assert flt.are_unsunk_ships_left()
+    flt.hit(0, 1)
+    flt.hit(5, 5)
+    assert not flt.are_unsunk_ships_left()
+    assert all(is_sunk(i) for i in flt)
+
+@pytest.mark.parametrize("seed", range(10))
+
+def test_fleet_placement(seed):
+    # checks that the square index of a Fleet agrees with the bitboards on every slot
+    flt = Fleet(randomly_place_all_ships(random.Random(seed))[:6])
+    for slot in [(r, c, h, l) for r in range(-1, 11) for c in range(-1, 11) for h in (False, True) for l in (1, 3)]:
+        assert ok_to_place_ship_at(*slot, flt) == ok_to_place_ship_at(*slot, list(flt))
+    assert all(is_open_sea(r, c, flt) == is_open_sea(r, c, list(flt)) for r in range(10) for c in range(10))
+
+
+'''
+board dimensions and fleet composition
+'''
+@pytest.mark.parametrize("rows, cols, fleet", [
+    (4, 5, (3, 2, 1)),
+    (6, 12, (5, 4, 2, 2, 1)),
+    (40, 30, (4, 3, 3, 2, 2, 2, 1, 1, 1, 1) * 6),
+    (1000, 1000, (4, 3, 3, 2, 2, 2, 1, 1, 1, 1) * 300)
+])
+
+def test_custom_ocean(rows, cols, fleet):
+    flt = randomly_place_all_ships(random.Random(0), fleet, rows, cols)
+    assert [i[3] for i in flt] == list(fleet)
+    assert all(0 <= r < rows and 0 <= c < cols for i in flt for r, c in coords(*i[:4]))
+    # checks each ship against the ships placed before it, through the square index of a Fleet
+    placed = Fleet(rows=rows, cols=cols)
+    for i in flt:
+        assert placed.ok_to_place_ship_at(*i[:4])
+        placed.place_ship_at(*i[:4])
+    if rows * cols <= SLOT_TABLE_LIMIT:
+        assert all(ok_to_place_ship_at(*flt[i][:4], flt[:i], rows, cols) for i in range(len(flt)))
+
+def test_custom_legal_slots():
+    # a 3 by 4 ocean has 12 squares for a submarine (in both orientations), 9 + 8 slots for a destroyer
+    # and 6 + 4 slots for a cruiser
+    assert len(legal_slots(3, 4, 3)) == 24 + 17 + 10
+
+@pytest.mark.parametrize("rows, cols, fleet", [
+    # a ship longer than the ocean
+    (4, 4, (5,)),
+    (40, 30, (41,)),
+    # ships that fit one by one but not together
+    (4, 4, (4,) * 5)
+])
+
+def test_fleet_that_does_not_fit(rows, cols, fleet):
+    with pytest.raises(ValueError):
+        randomly_place_all_ships(random.Random(0), fleet, rows, cols)
+
+def test_sparse_placement_gives_up():
+    from battleships import _place_sparse
+    with pytest.raises(ValueError):
+        _place_sparse((33,) * 20, 33, 33, RandomBlocks(random.Random(0)), attempts=100, restarts=3)
+
+@pytest.mark.parametrize("rows, cols", [(20, 20), (12, 30), (1000, 1000)])
+@pytest.mark.parametrize("wrap", [list, Fleet])
+
+def test_shots_beyond_the_standard_ocean(rows, cols, wrap):
+    # ships whose squares lie at row or column 10 and beyond, where a 10 by 10 mask has no bits
+    flt = wrap([(4, cols - 6, True, 4, set()), (rows - 3, 2, False, 3, set())])
+    assert not check_if_hits(4, cols - 7, flt, rows, cols)
+    assert check_if_hits(4, cols - 4, flt, rows, cols)
+    assert hit(4, cols - 4, flt, rows, cols)[1] == (4, cols - 6, True, 4, {(4, cols - 4)})
+    assert not check_if_hits(4, cols - 4, flt, rows, cols)
+    for r in range(rows - 3, rows):
+        assert hit(r, 2, flt, rows, cols)[1][3] == 3
+    assert is_sunk(flt[1])
+
+def test_large_oceans_are_indexed():
+    flt = randomly_place_all_ships(random.Random(0), FLEET * 3, 1000, 1000)
+    assert isinstance(flt, Fleet) and (flt.rows, flt.cols) == (1000, 1000)
+    ship_mask.cache_clear()
+    halo_mask.cache_clear()
+    # a plain list of ships on a large ocean is checked through a square index rather than bitboards
+    ships = list(flt)
+    assert ok_to_place_ship_at(*ships[0][:4], ships[1:], 1000, 1000)
+    assert not ok_to_place_ship_at(*ships[0][:4], ships, 1000, 1000)
+    assert all(not is_open_sea(r, c, ships, 1000, 1000) for r, c in coords(*ships[0][:4]))
+    assert ship_mask.cache_info().currsize == halo_mask.cache_info().currsize == 0
+
+def test_footprint_cache_is_bounded():
+    from battleships import _footprint
+    randomly_place_all_ships(random.Random(0), (4, 3, 3, 2, 2, 2, 1, 1, 1, 1) * 300, 1000, 1000)
+    assert _footprint.cache_info().currsize <= _footprint.cache_info().maxsize
+
+
+'''
+pack_fleet and unpack_fleet
+'''
+@pytest.mark.parametrize("test_input", [
+    [],
+    [(0, 0, True, 4, set())],
+    [(5, 5, False, 4, {(5, 5), (6, 5), (7, 5), (8, 5)})],
+    [
+        (3, 9, False, 4, {(3, 9), (4, 9), (5, 9)}),
+        (7, 2, True, 3, {(7, 4)}),
+        (1, 4, False, 3, set()),
+        (1, 0, False, 2, {(2, 0)}),
+        (5, 6, True, 2, set()),
+        (9, 3, True, 2, {(9, 3), (9, 4)}),
+        (9, 0, False, 1, {(9, 0)}),
+        (4, 0, True, 1, set()),
+        (8, 8, True, 1, set()),
+        (2, 6, False, 1, {(2, 6)})
+    ]
+])
 
-def test_are_unsunk_ships_left(test_input, expected):
-    assert are_unsunk_ships_left(test_input) == expected
+def test_pack_fleet(test_input):
+    record = pack_fleet(test_input)
+    assert len(record) == 2 * len(test_input)
+    assert unpack_fleet(record) == test_input
+
+
+'''
+GameState
+'''
+@pytest.mark.parametrize("shots, expected", [
+    ([(5, 5)], [MISS]),
+    ([(0, 0), (0, 0)], [HIT, REPEAT]),
+    ([(5, 5), (5, 5)], [MISS, REPEAT]),
+    ([(0, 0), (0, 1)], [HIT, SUNK]),
+    ([(3, 3), (0, 1), (0, 0), (0, 1)], [SUNK, HIT, SUNK, REPEAT])
+])
+
+def test_game_state_outcomes(shots, expected):
+    state = GameState([(0, 0, True, 2, set()), (3, 3, False, 1, set())])
+    assert [state.shoot(*i)[0] for i in shots] == expected
+    assert state.shots() == len(shots)
+
+def test_game_state():
+    flt = randomly_place_all_ships(random.Random(7))
+    state = GameState(copy.deepcopy(flt))
+    for r in range(10):
+        for c in range(10):
+            outcome, ship = state.shoot(r, c)
+            assert (outcome == MISS) == (ship is None)
+    assert state.over() and state.shots() == 100
+    # checks that every square of every ship is recorded as sunk, and every other square as missed
+    occupied = {j for i in flt for j in coords(*i[:4])}
+    assert all(state.cell(r, c) == (SUNK if (r, c) in occupied else MISS) for r in range(10) for c in range(10))
+    with pytest.raises(ValueError):
+        state.shoot(10, 0)
+
+
+'''
+play_batch, run_batch and main
+'''
+def test_play_batch():
+    everywhere = " ".join(f"{r} {c}" for r in range(10) for c in range(10))
+    results = [i.split("\t") for i in play_batch([everywhere, "", "5 5  5 5", everywhere], random.Random(2), True)]
+    assert [i[0] for i in results] == ["0", "1", "2"]
+    game, shots, over, hits, sinks, trace = results[0]
+    assert over == "1" and int(shots) == len(trace) <= 100
+    assert len(hits.split(",")) == sum(FLEET) and len(sinks.split(",")) == len(FLEET)
+    assert all(trace[int(i) - 1] == "s" for i in sinks.split(","))
+    assert results[1][1:3] == ["2", "0"] and len(results[1][5]) == 2 and results[1][5][1] == "r"
+    # checks that the same generator state draws the same fleets
+    assert results == [i.split("\t") for i in play_batch([everywhere, "5 5 5 5", everywhere], random.Random(2), True)]
+
+@pytest.mark.parametrize("line", ["0 0 1", "0 x", "0 10", "-1 0"])
+
+def test_play_batch_errors(line):
+    with pytest.raises(ValueError, match="line 2"):
+        list(play_batch(["0 0", line]))
+
+def test_main_batch(tmp_path, capsys):
+    source, output = tmp_path / "shots.txt", tmp_path / "results.txt"
+    source.write_text("0 0 0 1\n9 9\n")
+    main(["--batch", str(source), "-s", "3", "-o", str(output)])
+    lines = output.read_text().splitlines()
+    assert [len(i.split("\t")) for i in lines] == [5, 5]
+    main(["--batch", str(source), "-s", "3", "--trace"])
+    assert [i.rsplit("\t", 1)[0] for i in capsys.readouterr().out.splitlines()] == lines
+
+def test_main_repeated_shot(monkeypatch, capsys):
+    answers = iter(["0 0", "0 0", "quit"])
+    monkeypatch.setattr("builtins.input", lambda prompt: next(answers))
+    main([])
+    # checks that the command line reports a repeated shot in the words the pygame client uses
+    assert capsys.readouterr().out.splitlines()[1] == MESSAGES[REPEAT]
+
+def test_main_batch_errors(tmp_path, monkeypatch):
+    import battleships
+    monkeypatch.setattr(battleships, "BATCH_FLUSH", 1)
+    source, output = tmp_path / "shots.txt", tmp_path / "results.txt"
+    with pytest.raises(SystemExit, match="No such file"):
+        main(["--batch", str(tmp_path / "missing.txt"), "-o", str(output)])
+    # checks that a bad line, after results have been flushed, leaves no results file behind
+    source.write_text("0 0\n1 1\n0 x\n")
+    with pytest.raises(SystemExit, match="line 3"):
+        main(["--batch", str(source), "-o", str(output)])
+    assert list(tmp_path.iterdir()) == [source]
@@ -0,0 +1,61 @@
+import pytest, json
+from bench_battleships import *
+
+
+'''
+compare
+'''
+@pytest.mark.parametrize("current, expected", [
+    ({"a": 100.0, "b": 50.0}, [("a", 1.0, False), ("b", 1.0, False)]),
+    ({"a": 91.0, "b": 50.0}, [("a", 0.91, False), ("b", 1.0, False)]),
+    ({"a": 89.0, "b": 75.0}, [("a", 0.89, True), ("b", 1.5, False)]),
+    ({"b": 10.0, "c": 1.0}, [("b", 0.2, True)])
+])
+
+def test_compare(current, expected):
+    result = compare({"a": 100.0, "b": 50.0}, current)
+    assert [(i, pytest.approx(j), k) for i, j, k in expected] == result
+
+
+'''
+run_benchmarks and main
+'''
+def test_run_benchmarks():
+    results = run_benchmarks(scale=0.01, repeat=1)
+    assert set(results) == set(BENCHMARKS)
+    assert all(i > 0 for i in results.values())
+
+def test_main(tmp_path, capsys):
+    history, baseline = str(tmp_path / "history.json"), str(tmp_path / "baseline.json")
+    options = ["--history", history, "--baseline", baseline]
+    main(options + ["run", "-b", "is_open_sea", "--scale", "0.01", "-r", "1", "--save-baseline"])
+    main(options + ["run", "-b", "is_open_sea", "--scale", "0.01", "-r", "1", "--label", "second"])
+    with open(history) as f:
+        records = json.load(f)
+    assert [i["label"] for i in records] == ["", "second"]
+    # checks that a run far slower than the baseline fails the comparison
+    records[-1]["results"]["is_open_sea"] /= 10
+    with open(history, "w") as f:
+        json.dump(records, f)
+    with pytest.raises(SystemExit) as exit:
+        main(options + ["compare"])
+    assert exit.value.code == 1
+    assert "REGRESSION" in capsys.readouterr().out
+
+@pytest.mark.parametrize("setting, value", [("scale", 0.02), ("seed", 1), ("python", "2.7.18")])
+
+def test_compare_mismatched_runs(tmp_path, setting, value):
+    history, baseline = str(tmp_path / "history.json"), str(tmp_path / "baseline.json")
+    options = ["--history", history, "--baseline", baseline]
+    main(options + ["run", "-b", "is_open_sea", "--scale", "0.01", "-r", "1", "--save-baseline"])
+    with open(history) as f:
+        records = json.load(f)
+    assert mismatched_settings(records[-1], records[-1]) == []
+    # checks that a run under other settings than the baseline is not compared against it
+    records[-1][setting] = value
+    assert mismatched_settings(load(baseline), records[-1]) == [setting]
+    with open(history, "w") as f:
+        json.dump(records, f)
+    with pytest.raises(SystemExit) as exit:
+        main(options + ["compare"])
+    assert setting in str(exit.value.code)
@@ -0,0 +1,75 @@
+import pytest, random
+from canonical import *
+from battleships import FLEET, randomly_place_all_ships, fleet_mask
+from corpus import write_corpus
+
+
+def image(flt, t):
+    '''
+    returns the image of flt under the symmetry of index t, in the tuple format
+    '''
+    result = []
+    for row, col, hor, lth, *hits in flt:
+        moved = sorted(SYMMETRIES[t](r, c) for r, c in coords(row, col, hor, lth))
+        result.append((*moved[0], lth == 1 or moved[0][0] == moved[-1][0], lth))
+    return result
+
+
+'''
+canonical_form, canonical_fleet and canonical_hash
+'''
+@pytest.mark.parametrize("seed", range(20))
+
+def test_images_share_form(seed):
+    flt = randomly_place_all_ships(random.Random(seed))
+    record, t = canonical_form(flt)
+    for i in range(len(SYMMETRIES)):
+        assert canonical_form(image(flt, i))[0] == record
+        assert canonical_hash(image(flt, i)) == canonical_hash(flt)
+    # checks that the canonical fleet is the image of flt under the symmetry reported
+    assert fleet_mask(canonical_fleet(flt)) == fleet_mask(image(flt, t))
+    assert len(record) == 10 and record == min(canonical_form(image(flt, i))[0] for i in range(8))
+
+def test_distinct_classes():
+    fleets = [randomly_place_all_ships(random.Random(seed)) for seed in range(50)]
+    assert len({canonical_hash(flt) for flt in fleets}) == 50
+
+def test_symmetric_fleet():
+    # a fleet symmetric under a half turn maps to itself
+    flt = [(0, 0, True, 4), (9, 6, True, 4)]
+    assert canonical_form(flt)[0] == canonical_form(image(flt, 2))[0]
+    assert [i[:4] for i in canonical_fleet(flt)] == [(0, 0, False, 4), (6, 9, False, 4)]
+
+def test_submarine_orientation():
+    assert canonical_hash([(4, 4, True, 1)]) == canonical_hash([(4, 4, False, 1)])
+
+
+'''
+DedupIndex and dedupe_corpus
+'''
+def test_index(tmp_path):
+    path = str(tmp_path / "index.db")
+    flt = randomly_place_all_ships(random.Random(3))
+    with DedupIndex(path) as index:
+        assert flt not in index
+        assert index.add(flt)
+        assert not index.add(image(flt, 5))
+        assert image(flt, 1) in index
+        assert len(index) == 1
+    # checks that the index persists between runs
+    with DedupIndex(path) as index:
+        assert flt in index
+
+def test_dedupe_corpus(tmp_path):
+    source, target, index = (str(tmp_path / i) for i in ("fleets.bin", "unique.bin", "index.db"))
+    write_corpus(source, 20, seed=2)
+    with Corpus(source) as corpus:
+        fleets = corpus[:]
+    with CorpusWriter(source, FLEET) as writer:
+        for flt in fleets + [image(flt, 6) for flt in fleets[:5]]:
+            writer.write(flt)
+    assert dedupe_corpus(source, target, index) == 20
+    with Corpus(target) as corpus:
+        assert len(corpus) == 20
+    # checks that fleets already indexed are dropped on a later run
+    assert dedupe_corpus(source, str(tmp_path / "again.bin"), index) == 0
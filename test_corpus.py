@@ -0,0 +1,72 @@
+import pytest, os
+from corpus import *
+from battleships import randomly_place_all_ships
+
+
+'''
+write_corpus and Corpus
+'''
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "fleets.bin")
+    write_corpus(path, 25, seed=4, chunk_size=7)
+    expected = [decode_fleet(b"".join(generate_fleets(25, seed=4))[i:i + 10]) for i in range(0, 250, 10)]
+    # a 32-byte header, then 10 bytes per fleet
+    assert os.path.getsize(path) == 32 + 25 * 10
+    with Corpus(path) as corpus:
+        assert len(corpus) == 25
+        assert corpus.lengths() == FLEET
+        assert list(corpus) == expected
+        # checks random access, negative indices and slicing
+        assert corpus[17] == expected[17]
+        assert corpus[-1] == expected[-1]
+        assert corpus[3:9:2] == expected[3:9:2]
+        records = corpus.records(5, 7)
+        assert bytes(records) == b"".join(bytes(encode_ship(*i[:3]) for i in flt) for flt in expected[5:7])
+        records.release()
+        with pytest.raises(IndexError):
+            corpus[25]
+
+def test_invalid_chunk_size(tmp_path):
+    path = tmp_path / "fleets.bin"
+    with pytest.raises(ValueError):
+        write_corpus(str(path), 3, seed=0, chunk_size=0)
+    assert not path.exists()
+
+def test_writer(tmp_path):
+    path = str(tmp_path / "fleets.bin")
+    fleets = [randomly_place_all_ships() for _ in range(3)]
+    with CorpusWriter(path) as writer:
+        for flt in fleets:
+            writer.write(flt)
+        # checks that a fleet of another composition is rejected
+        with pytest.raises(ValueError):
+            writer.write(fleets[0][:5])
+    with Corpus(path) as corpus:
+        assert corpus[:] == fleets
+
+def test_not_a_corpus(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(bytes(64))
+    with pytest.raises(ValueError):
+        Corpus(str(path))
+
+@pytest.mark.parametrize("size", [0, 16, 32 + 5 * 10 - 15, 32 + 5 * 10 + 1])
+
+def test_truncated_corpus(tmp_path, size):
+    path = tmp_path / "fleets.bin"
+    write_corpus(str(path), 5, seed=2)
+    data = path.read_bytes()
+    path.write_bytes(data[:size] if size <= len(data) else data + bytes(size - len(data)))
+    with pytest.raises(ValueError):
+        Corpus(str(path))
+
+def test_array(tmp_path):
+    pytest.importorskip("numpy")
+    path = str(tmp_path / "fleets.bin")
+    write_corpus(path, 12, seed=1)
+    corpus = Corpus(path)
+    codes = corpus.array()
+    assert codes.shape == (12, 10)
+    assert codes.tobytes() == b"".join(generate_fleets(12, seed=1))
+    del codes
+    corpus.close()
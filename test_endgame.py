@@ -0,0 +1,78 @@
+import pytest
+from random import Random
+from endgame import *
+from battleships import randomly_place_all_ships, check_if_hits, hit
+
+FULL = (1 << 100) - 1
+
+def brute_force(free, need, lengths):
+    '''
+    returns (total, occupancy) by trying every combination of placements of the ships of the given lengths
+    '''
+    placements = {l: {(ship_mask(*i), halo_mask(*i)) for i in legal_slots() if i[3] == l} for l in set(lengths)}
+    found = set()
+    def place(i, occupied, halo, chosen):
+        if i == len(lengths):
+            if not need & ~occupied and not need & halo & ~occupied:
+                found.add(frozenset(chosen))
+            return
+        for mask, h in placements[lengths[i]]:
+            # a ship lying wholly on unsunk hits would have been reported sunk
+            if not mask & ~free and not mask & halo and mask & ~need:
+                place(i + 1, occupied | mask, halo | h, chosen + [mask])
+    place(0, 0, 0, [])
+    occupancy = Counter()
+    for i in found:
+        for mask in i:
+            occupancy.update(j for j in range(100) if mask >> j & 1)
+    return len(found), occupancy
+
+
+'''
+EndgameCounter.count
+'''
+@pytest.mark.parametrize("free, need, lengths", [
+    (FULL, 0, (4,)),
+    (FULL, 0, (1, 1)),
+    (FULL, 0, (2, 1)),
+    # checks that a hit must be covered, and that no other ship may touch it
+    (FULL, 1 << 44, (3, 1)),
+    (FULL, 1 << 44 | 1 << 45, (3, 2)),
+    # checks that a ship may not lie wholly on unsunk hits
+    (FULL, 1 << 55, (2, 1)),
+    (FULL, 1 << 44 | 1 << 45, (2, 2)),
+    # checks that blocked squares are avoided
+    (FULL & ~sum(1 << i for i in range(0, 100, 3)), 0, (3, 2)),
+])
+
+def test_count(free, need, lengths):
+    left = tuple(lengths.count(i) for i in range(1, 5))
+    assert EndgameCounter().count(free, need, left) == brute_force(free, need, lengths)
+
+def test_count_out_of_time():
+    with pytest.raises(OutOfTime):
+        EndgameCounter(time_budget=1e-6).count(FULL, 0, (4, 3, 2, 1))
+
+
+'''
+EndgameSolver
+'''
+@pytest.mark.parametrize("seed", range(3))
+
+def test_probabilities(seed):
+    rng = Random(seed)
+    flt = randomly_place_all_ships(rng)
+    solver = EndgameSolver(rng, max_ships=0)
+    # plays with the density map until only two ships are afloat
+    while sum(solver._afloat) > 2:
+        row, col = solver.next_shot()
+        solver.record(row, col, hit(row, col, flt)[1] if check_if_hits(row, col, flt) else None)
+
+    lengths = tuple(l for l in range(1, 5) for _ in range(solver._afloat[l - 1]))
+    total, occupancy = brute_force(FULL & ~solver._blocked, solver._need, lengths)
+    probabilities = solver.probabilities()
+    assert probabilities == {divmod(i, 10): occupancy[i] / total for i in solver._open}
+
+def test_next_shot_falls_back_when_out_of_time():
+    solver = EndgameSolver(max_ships=10, time_budget=1e-6)
+    assert solver.next_shot() == DensitySolver().next_shot()
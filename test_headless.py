@@ -0,0 +1,62 @@
+import pytest, random
+pytest.importorskip("pygame")
+from headless import *
+
+
+@pytest.fixture(autouse=True)
+def font_cache(tmp_path, monkeypatch):
+    # keeps the fonts the games resolve out of the real cache in the home directory
+    monkeypatch.setattr(battleships_game, "FONT_CACHE", str(tmp_path / "fonts.json"))
+
+
+'''
+percentile
+'''
+@pytest.mark.parametrize("p, expected", [
+    (50, 5),
+    (99, 10),
+    (100, 10),
+    (1, 1),
+    (0, 1)
+])
+
+def test_percentile(p, expected):
+    assert percentile([7, 3, 10, 1, 5, 2, 9, 4, 8, 6], p) == expected
+
+
+'''
+Headless, run_script and play_random
+'''
+def test_run_script():
+    headless = Headless(seed=1, fade_duration=0)
+    run_script(headless, [
+        "# shoots the same cell twice",
+        "click 0 0",
+        "click 0 0",
+        "",
+        "idle 3",
+        "quit",
+        "click 1 1 # ignored, as the game is closed"
+    ])
+    headless.close()
+    assert battleships_game.FADE_DURATION == 2000
+    assert headless.game._state.shots() == 2
+    report = headless.report()
+    # 2 clicks, 3 idle frames and the frame in which the window is closed
+    assert report["running"]["calls"] == report["update"]["calls"] == 6
+    assert report["game_logic"]["calls"] == 2
+    assert report["update"]["p50"] <= report["update"]["p99"] <= report["update"]["max"]
+
+def test_unknown_step():
+    headless = Headless(fade_duration=0)
+    with pytest.raises(ValueError):
+        run_script(headless, ["click 0 0", "jump"])
+    headless.close()
+
+def test_play_random():
+    headless = Headless(seed=2, fade_duration=0)
+    play_random(headless, 2, random.Random(2))
+    headless.close()
+    # checks that the second game was started afresh after the first one ended
+    assert not headless.game.over()
+    assert 2 * 20 <= headless.report()["game_logic"]["calls"] <= 200
@@ -0,0 +1,90 @@
+import pytest, io, json, random
+import instrument
+from battleships import FLEET, Fleet, coords, randomly_place_all_ships, check_if_hits, hit, GameState
+from simulate import simulate
+
+
+@pytest.fixture
+def recording():
+    instrument.reset()
+    instrument.enable()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+
+'''
+count, maximum, observe and snapshot
+'''
+def test_snapshot(recording):
+    instrument.count("a")
+    instrument.count("a", 4)
+    instrument.maximum("depth", 3)
+    instrument.maximum("depth", 2)
+    instrument.maximum("low", -5)
+    for i in range(1, 101):
+        instrument.observe("frame", i / 1000)
+    snap = instrument.snapshot()
+    assert snap["counters"] == {"a": 5}
+    assert snap["maxima"] == {"depth": 3, "low": -5}
+    frame = snap["timings"]["frame"]
+    assert frame["count"] == 100
+    assert (frame["p50_ms"], frame["p99_ms"], frame["max_ms"]) == pytest.approx((50, 99, 100))
+    assert frame["mean_ms"] == pytest.approx(50.5)
+
+def test_dump(recording):
+    instrument.count("shots", 7)
+    instrument.observe("frame", 0.002)
+    stream = io.StringIO()
+    instrument.dump(stream, "json")
+    assert json.loads(stream.getvalue())["counters"] == {"shots": 7}
+    stream = io.StringIO()
+    instrument.dump(stream)
+    assert "shots: 7" in stream.getvalue() and "frame: 1 times" in stream.getvalue()
+
+def test_dumper(recording, tmp_path):
+    path = str(tmp_path / "counters.json")
+    instrument.count("a")
+    dumper = instrument.Dumper(path, interval=60, fmt="json")
+    dumper.stop()
+    # checks that stopping writes a last snapshot
+    with open(path) as f:
+        assert [json.loads(i)["counters"] for i in f] == [{"a": 1}]
+
+
+'''
+instrumented code
+'''
+def test_disabled():
+    instrument.reset()
+    coords(0, 0, True, 3)
+    randomly_place_all_ships()
+    assert instrument.snapshot()["counters"] == {}
+
+def test_rules_engine(recording):
+    coords(0, 0, True, 3)
+    assert instrument.snapshot()["counters"]["coords"] == 1
+    instrument.reset()
+    rng = random.Random(0)
+    for _ in range(20):
+        randomly_place_all_ships(rng)
+    randomly_place_all_ships(rng, (4, 3, 2) * 100, 100, 100)
+    state = GameState(randomly_place_all_ships(rng))
+    for i in range(5):
+        state.shoot(0, i)
+    snap = instrument.snapshot()
+    assert snap["counters"]["placements"] == 22 and snap["counters"]["shots"] == 5
+    assert 1 <= snap["maxima"]["placement_attempts"] <= snap["counters"].get("placement_retries", 0) + 1
+
+@pytest.mark.parametrize("wrap", [list, Fleet])
+
+def test_shots_outside_game_state(recording, wrap):
+    flt = wrap(randomly_place_all_ships(random.Random(0)))
+    for row, col in coords(*flt[0][:4]):
+        if check_if_hits(row, col, flt):
+            hit(row, col, flt)
+    assert instrument.snapshot()["counters"]["shots"] == flt[0][3]
+    instrument.reset()
+    # simulated games resolve the shots that hit through hit, at least one per square of each fleet
+    simulate(5, seed=1)
+    assert instrument.snapshot()["counters"]["shots"] >= 5 * sum(FLEET)
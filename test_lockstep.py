@@ -0,0 +1,47 @@
+import pytest
+from random import Random
+np = pytest.importorskip("numpy")
+from lockstep import *
+from battleships import randomly_place_all_ships, check_if_hits, hit, is_sunk, are_unsunk_ships_left
+
+
+'''
+shoot
+'''
+@pytest.mark.parametrize("seed", range(3))
+
+def test_shoot_matches_rules(seed):
+    rng = Random(seed)
+    fleets = [randomly_place_all_ships(rng) for _ in range(8)]
+    games = Lockstep.from_fleets(fleets)
+    for _ in range(150):
+        shots = [(rng.randrange(10), rng.randrange(10)) for _ in fleets]
+        hits, sunk, over = games.shoot([i for i, _ in shots], [j for _, j in shots])
+        # checks each game against the tuple-fleet rules engine
+        for k, (flt, (row, col)) in enumerate(zip(fleets, shots)):
+            was_over = not are_unsunk_ships_left(flt)
+            expected = not was_over and check_if_hits(row, col, flt)
+            assert hits[k] == expected
+            assert sunk[k] == (expected and is_sunk(hit(row, col, flt)[1]))
+            assert over[k] == (expected and not are_unsunk_ships_left(flt))
+
+    assert list(games.over()) == [not are_unsunk_ships_left(i) for i in fleets]
+
+def test_shoot_same_square():
+    games = Lockstep.from_fleets([[(0, 0, True, 1, set())], [(5, 5, True, 1, set())]])
+    hits, sunk, over = games.shoot(0, 0)
+    assert list(hits) == [True, False]
+    assert list(over) == [True, False]
+    # checks that shots in a finished game are not counted
+    games.shoot(5, 5)
+    assert list(games.shots()) == [1, 2]
+
+
+'''
+play_random
+'''
+def test_play_random():
+    shots = play_random(200, seed=1)
+    assert len(shots) == 200
+    assert shots.min() >= 20 and shots.max() <= 100
+    assert (shots == play_random(200, seed=1)).all()
@@ -0,0 +1,81 @@
+import pytest
+from simulate import *
+from battleships import FLEET
+
+
+'''
+task_seed
+'''
+def test_task_seed():
+    assert task_seed(1, 0) == task_seed(1, 0)
+    # checks that neighbouring tasks and seeds do not share streams
+    assert len({task_seed(i, j) for i in range(10) for j in range(10)}) == 100
+
+
+'''
+play
+'''
+@pytest.mark.parametrize("seed", range(5))
+
+def test_play(seed):
+    rng = random.Random(seed)
+    flt = randomly_place_all_ships(rng)
+    # a random player needs at least one shot per square of the fleet and never repeats a shot
+    assert 20 <= play(flt, RandomPlayer(rng)) <= 100
+    assert not are_unsunk_ships_left(flt)
+
+
+'''
+simulate
+'''
+def test_simulate():
+    summary = simulate(20, seed=3)
+    assert summary.games() == 20
+    assert summary.histogram() == simulate(20, seed=3).histogram()
+
+
+'''
+run
+'''
+def test_run_is_independent_of_workers():
+    one = run(30, workers=1, seed=7, task_size=8)
+    two = run(30, workers=2, seed=7, task_size=8)
+    assert one.games() == 30
+    assert one.histogram() == two.histogram()
+
+
+'''
+generate
+'''
+def test_generate_is_independent_of_workers():
+    one = list(generate(30, workers=1, seed=7, task_size=8))
+    two = list(generate(30, workers=2, seed=7, task_size=8))
+    assert [len(i) // len(FLEET) for i in one] == [8, 8, 8, 6]
+    assert one == two
+    # checks that each chunk holds the fleets generate_fleets draws from the seed of its task
+    assert one[1] == b"".join(generate_fleets(8, task_seed(7, 1)))
+    with pytest.raises(ValueError):
+        generate(30, workers=1, task_size=0)
+
+def test_main_writes_fleets(tmp_path, capsys):
+    from corpus import Corpus
+    path = str(tmp_path / "fleets.bin")
+    main(["-n", "12", "-j", "2", "--task-size", "5", "--fleets", path])
+    with Corpus(path) as corpus:
+        assert len(corpus) == 12
+        records = bytes(corpus.records())
+    assert records == b"".join(generate(12, workers=1, seed=0, task_size=5))
+    assert "12 fleets" in capsys.readouterr().out
+
+
+'''
+Summary
+'''
+def test_summary():
+    first, second = Summary(), Summary()
+    for i in (30, 40, 40):
+        first.add(i)
+    second.add(50)
+    assert first.merge(second).histogram() == {30: 1, 40: 2, 50: 1}
+    assert first.mean() == 40
+    assert str(Summary()) == "No games played."
@@ -0,0 +1,70 @@
+import pytest
+from random import Random
+from solver import *
+from battleships import randomly_place_all_ships, check_if_hits, hit, ship_mask
+from simulate import play
+
+def from_scratch(misses, hits, sunk):
+    '''
+    returns the density map of each length recomputed from the shot history, for comparison with the incremental one
+    '''
+    density = [[0] * 100 for _ in range(4)]
+    hit_mask = sum(1 << i for i in hits)
+    for row, col, hor, lth in legal_slots():
+        if lth == 1 and hor:
+            continue
+        mask, halo = ship_mask(row, col, hor, lth), halo_mask(row, col, hor, lth)
+        if mask & misses or hit_mask & halo & ~mask or any(halo_mask(*i[:4]) & mask for i in sunk):
+            continue
+        for i in range(100):
+            if mask >> i & 1:
+                density[lth - 1][i] += 1
+    return density
+
+
+'''
+record
+'''
+@pytest.mark.parametrize("seed", range(5))
+
+def test_density_is_updated_incrementally(seed):
+    rng = Random(seed)
+    flt = randomly_place_all_ships(rng)
+    solver = DensitySolver(rng)
+    misses, hits, sunk = 0, set(), []
+    for _ in range(30):
+        row, col = solver.next_shot()
+        ship_hit = hit(row, col, flt)[1] if check_if_hits(row, col, flt) else None
+        solver.record(row, col, ship_hit)
+        if ship_hit is None:
+            misses |= 1 << (row * 10 + col)
+        else:
+            hits.add(row * 10 + col)
+            if is_sunk(ship_hit):
+                sunk.append(ship_hit)
+        assert solver._density == from_scratch(misses, hits, sunk)
+
+
+'''
+next_shot
+'''
+@pytest.mark.parametrize("seed", range(10))
+
+def test_solver_sinks_fleet(seed):
+    rng = Random(seed)
+    flt = randomly_place_all_ships(rng)
+    shots = []
+    class Recorder(DensitySolver):
+        def next_shot(self):
+            shots.append(super().next_shot())
+            return shots[-1]
+    # checks that the solver finishes well within the board and never wastes a shot on the same square
+    assert play(flt, Recorder(rng)) < 100
+    assert len(set(shots)) == len(shots)
+
+def test_first_shot_is_densest():
+    solver = DensitySolver()
+    scores = solver.scores()
+    assert scores[solver.next_shot()] == max(scores.values())
+    # checks that the corners, covered by the fewest placements, score lowest
+    assert scores[(0, 0)] == min(scores.values())